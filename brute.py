@@ -0,0 +1,178 @@
+"""Brute force over all the placements of L pieces on a 2 x n board.
+
+The ground truth for the solvers: nothing here uses the recurrence of the deck.
+
+A piece is (rot, col): the LShapePiece rotation (0, 90, 180 or 270 degrees
+clockwise, like in tutorial.py) placed on the 2 x 2 block of columns col and
+col + 1, which is also the position given to Floor.get_coor.
+
+The board is scanned column by column, the profile being the cells of the
+current column already taken by a piece started in the previous one (bit 0 for
+the bottom row, bit 1 for the top row).
+"""
+import argparse
+import random
+import sys
+import time
+
+import solver
+
+COVERAGE = 3  # every piece covers 3 cells
+
+# cells (column offset, row) of each rotation, row 0 is the bottom one
+CELLS = {
+    0: ((0, 0), (0, 1), (1, 1)),
+    90: ((0, 1), (1, 0), (1, 1)),
+    180: ((0, 0), (1, 0), (1, 1)),
+    270: ((0, 0), (0, 1), (1, 0)),
+}
+
+
+def masks(rot):
+    # cells of the piece in its first and second column, as profiles
+    first = second = 0
+    for col, row in CELLS[rot]:
+        if col == 0:
+            first |= 1 << row
+        else:
+            second |= 1 << row
+    return first, second
+
+
+MASKS = {rot: masks(rot) for rot in CELLS}
+
+
+def transitions(n, col, profile):
+    """(piece or None, profile of the next column) for every way to fill column col."""
+    yield None, 0
+    if col + 1 < n:
+        for rot, (first, second) in MASKS.items():
+            if first & profile == 0:
+                yield (rot, col), second
+
+
+def tilings(n):
+    """Every placement of pieces on the 2 x n board, as a tuple of (rot, col).
+
+    A generator: there are far too many of them to keep for big n.
+    """
+    pieces = []
+
+    def fill(col, profile):
+        if col == n:
+            yield tuple(pieces)
+            return
+        for piece, next_profile in transitions(n, col, profile):
+            if piece is not None:
+                pieces.append(piece)
+            yield from fill(col + 1, next_profile)
+            if piece is not None:
+                pieces.pop()
+
+    return fill(0, 0)
+
+
+def coverage(tiling):
+    return COVERAGE * len(tiling)
+
+
+def count(n):
+    """(cnt_n, sum_n), exactly, with the profile DP over the same transitions."""
+    # profile -> (number of placements, total coverage) of the columns before
+    dp = {0: (1, 0)}
+    for col in range(n):
+        next_dp = {}
+        for profile, (cnt, total) in dp.items():
+            for piece, next_profile in transitions(n, col, profile):
+                added = 0 if piece is None else COVERAGE * cnt
+                old_cnt, old_total = next_dp.get(next_profile, (0, 0))
+                next_dp[next_profile] = (old_cnt + cnt, old_total + total + added)
+        dp = next_dp
+    return dp.get(0, (0, 0))
+
+
+def completions(n):
+    """completions[col][profile]: number of ways to fill the columns from col on."""
+    table = [None] * (n + 1)
+    table[n] = {profile: 1 for profile in range(4)}
+    for col in range(n - 1, -1, -1):
+        table[col] = {
+            profile: sum(table[col + 1][next_profile] for _, next_profile in transitions(n, col, profile))
+            for profile in range(4)
+        }
+    return table
+
+
+def sample(n, rng=random, table=None):
+    """A tiling chosen uniformly at random among all of them, in O(n) steps.
+
+    Every column picks its transition with a probability proportional to the
+    number of ways to finish the board after it.
+    """
+    table = table or completions(n)
+    pieces = []
+    profile = 0
+    for col in range(n):
+        choices = list(transitions(n, col, profile))
+        pick = rng.randrange(table[col][profile])
+        for piece, next_profile in choices:
+            pick -= table[col + 1][next_profile]
+            if pick < 0:
+                break
+        if piece is not None:
+            pieces.append(piece)
+        profile = next_profile
+    return tuple(pieces)
+
+
+def examples(n, size, seed=None):
+    """Up to size (tiling, coverage) pairs for the 2 x n board, lazily.
+
+    Every tiling, in enumeration order, if there are at most size of them,
+    otherwise size tilings sampled uniformly at random.
+    """
+    table = completions(n)
+    if table[0][0] <= size:
+        for tiling in tilings(n):
+            yield tiling, coverage(tiling)
+        return
+    rng = random.Random(seed)
+    for _ in range(size):
+        tiling = sample(n, rng, table)
+        yield tiling, coverage(tiling)
+
+
+def verify(max_n=40, max_enumerated_n=12):
+    """Check the solver against the DP up to max_n, and the DP against the
+    enumeration up to max_enumerated_n. Returns the first wrong n, or None."""
+    for n in range(max_n + 1):
+        expected = count(n)
+        if solver.solve(n, mod=None) != expected:
+            return n
+        if n <= max_enumerated_n:
+            cnt = total = 0
+            for tiling in tilings(n):
+                cnt += 1
+                total += coverage(tiling)
+            if (cnt, total) != expected:
+                return n
+            if completions(n)[0][0] != cnt:
+                return n
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the solver against the brute force.')
+    parser.add_argument('max_n', type=int, nargs='?', default=40)
+    parser.add_argument('--max-enumerated-n', type=int, default=12, help='also enumerate every tiling up to this n')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    wrong = verify(args.max_n, args.max_enumerated_n)
+    if wrong is not None:
+        sys.exit(f'solver and brute force disagree for n = {wrong}')
+    print(f'ok, n <= {args.max_n} in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""Local render farm: several builds of the deck, resumable after a crash.
+
+    python farm.py --build hd=-qh --build draft="-ql DRAFT=1" [--workers 4] [--retries 1]
+    python farm.py --status
+
+A build is a name and the arguments of its renders: manim flags, and
+KEY=VALUE environment variables for tutorial.py. Every build is split into
+one job per section scene, and the jobs of all the builds run on a pool of
+--workers manim processes. They share the caches of media/ (TeX, text, and
+the slide cache), each build renders into media/farm/<build>/.
+
+Jobs are incremental renders (see slide_cache.py): every slide is stored in
+the slide cache as soon as it is rendered. A job that fails, or a farm that
+is killed, loses at most the slide being rendered, the next run of the job
+reuses the others.
+
+media/farm/manifest.json tracks every job: status (pending, running, done,
+failed), attempts, duration, output video and its sha256, the fingerprint of
+the deck it was rendered from (its sources, manim.cfg and the versions of Manim
+and manim-slides), and how many of its slides were rendered or reused. A job
+is done for good only while its output still has that hash and the deck that
+fingerprint: after an edit every job runs again, reusing the slides that did
+not change. When all the jobs of a build are done, its sections are
+glued into media/farm/<build>/HallwayTilingTutorial.mp4 and
+media/farm/<build>/slides/HallwayTilingTutorial.json (present them from
+media/farm/<build>).
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from pathlib import Path
+
+import tex_cache
+from render import DECK, MODULE, SECTION_SCENES, concat_videos, merge_slides
+
+HERE = Path(__file__).resolve().parent
+FARM_DIR = HERE / 'media' / 'farm'
+MANIFEST = FARM_DIR / 'manifest.json'
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def deck_fingerprint():
+    h = hashlib.sha256()
+    for path in sorted(HERE.glob('*.py')) + [HERE / 'manim.cfg']:
+        h.update(path.name.encode() + b'\0' + path.read_bytes() + b'\0')
+    for package in ('manim', 'manim-slides'):
+        try:
+            h.update(metadata.version(package).encode())
+        except metadata.PackageNotFoundError:
+            pass
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def parse_build(spec):
+    name, _, args = spec.partition('=')
+    if not re.fullmatch(r'[\w.-]+', name):
+        raise argparse.ArgumentTypeError(f'builds look like NAME=ARGS, got {spec!r}')
+    manim_args = []
+    env = {}
+    for token in shlex.split(args):
+        match = re.fullmatch(r'([A-Z_][A-Z0-9_]*)=(.*)', token)
+        if match:
+            env[match[1]] = match[2]
+        else:
+            manim_args.append(token)
+    return name, {'args': manim_args, 'env': env}
+
+
+class Manifest:
+    def __init__(self, path=MANIFEST):
+        self.path = path
+        self.deck = deck_fingerprint()
+        self.lock = threading.Lock()
+        self.data = {'builds': {}, 'jobs': {}, 'outputs': {}}
+        if path.exists():
+            with open(path) as f:
+                self.data = json.load(f)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        # never a half written manifest, even when killed
+        os.replace(tmp, self.path)
+
+    def update(self, job, **fields):
+        with self.lock:
+            self.data['jobs'].setdefault(job, {}).update(fields)
+            self.save()
+
+    def set_build(self, name, build):
+        if self.data['builds'].get(name) != build:
+            # other settings, other outputs: the jobs of the build start over
+            for job in self.build_jobs(name):
+                self.data['jobs'][job] = {'status': 'pending'}
+            self.data['outputs'].pop(name, None)
+        self.data['builds'][name] = build
+        for scene in SECTION_SCENES:
+            self.data['jobs'].setdefault(job_name(name, scene), {'status': 'pending'})
+        self.save()
+
+    def build_jobs(self, name):
+        return [job_name(name, scene) for scene in SECTION_SCENES]
+
+    def is_done(self, job):
+        state = self.data['jobs'].get(job, {})
+        if state.get('status') != 'done' or state.get('deck') != self.deck:
+            return False
+        output = Path(state['output'])
+        return output.exists() and file_hash(output) == state['hash']
+
+
+def job_name(build, scene):
+    return f'{build}/{scene}'
+
+
+def build_dir(build):
+    return FARM_DIR / build
+
+
+def find_video(build, scene):
+    videos = (build_dir(build) / 'media' / scene).glob(f'videos/{MODULE}/*/{scene}.mp4')
+    return max(videos, key=os.path.getmtime, default=None)
+
+
+def slides_summary(report):
+    if not report.exists():
+        return None
+    with open(report) as f:
+        slides = json.load(f)
+    return {status: sum(slide['status'] == status for slide in slides) for status in ('rendered', 'cached')}
+
+
+def run_job(manifest, build, scene, retries):
+    name = job_name(build, scene)
+    settings = manifest.data['builds'][build]
+    directory = build_dir(build)
+    directory.mkdir(parents=True, exist_ok=True)
+    report = directory / f'{scene}.slides.json'
+    cmd = [
+        sys.executable, '-m', 'manim', str(HERE / f'{MODULE}.py'), scene,
+        '--config_file', str(HERE / 'manim.cfg'),
+        '--media_dir', str(directory / 'media' / scene),
+        *settings['args'],
+    ]
+    env = {
+        **os.environ, **settings['env'],
+        'INCREMENTAL': '1', 'SLIDE_REPORT': str(directory / '{scene}.slides.json'),
+    }
+
+    for _ in range(retries + 1):
+        attempts = manifest.data['jobs'][name].get('attempts', 0) + 1
+        manifest.update(name, status='running', attempts=attempts, started=time.time())
+        report.unlink(missing_ok=True)
+        start = time.perf_counter()
+        # the slides files of manim-slides are written to the working directory
+        with open(directory / f'{scene}.log', 'w') as log:
+            result = subprocess.run(cmd, cwd=directory, env=env, stdout=log, stderr=subprocess.STDOUT)
+        duration = round(time.perf_counter() - start, 2)
+        video = find_video(build, scene)
+        if result.returncode == 0 and video is not None:
+            manifest.update(
+                name, status='done', duration=duration, output=str(video), hash=file_hash(video), deck=manifest.deck,
+                slides=slides_summary(report),
+            )
+            return True
+        manifest.update(name, status='failed', duration=duration, log=str(directory / f'{scene}.log'))
+    return False
+
+
+def assemble(manifest, build):
+    jobs = manifest.data['jobs']
+    videos = [jobs[job_name(build, scene)]['output'] for scene in SECTION_SCENES]
+    directory = build_dir(build)
+    video = concat_videos(videos, directory / f'{DECK}.mp4')
+    slides = merge_slides(SECTION_SCENES, DECK, directory / 'slides')
+    with manifest.lock:
+        manifest.data['outputs'][build] = {'video': str(video), 'hash': file_hash(video), 'slides': str(slides)}
+        manifest.save()
+    return video
+
+
+def run(builds, workers, retries):
+    manifest = Manifest()
+    for name, build in builds.items():
+        manifest.set_build(name, build)
+
+    pending = [
+        (name, scene) for name in builds for scene in SECTION_SCENES
+        if not manifest.is_done(job_name(name, scene))
+    ]
+    done = len(builds) * len(SECTION_SCENES) - len(pending)
+    print(f'{len(pending)} jobs to run, {done} already done', flush=True)
+
+    tex_cache.collect()
+    # the work happens in the manim processes, threads are enough to wait on them
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: run_job(manifest, *job, retries), pending))
+
+    failed = [job_name(*job) for job, ok in zip(pending, results) if not ok]
+    for name in builds:
+        if all(manifest.is_done(job) for job in manifest.build_jobs(name)):
+            print(f'{name}: {assemble(manifest, name)}')
+    if failed:
+        sys.exit('failed jobs (run again to resume them):\n' + '\n'.join(failed))
+
+
+def print_status():
+    manifest = Manifest()
+    for job, state in manifest.data['jobs'].items():
+        slides = state.get('slides') or {}
+        print(
+            f"{job:40} {state.get('status', ''):8} attempts={state.get('attempts', 0)}"
+            f" duration={state.get('duration', '')} rendered={slides.get('rendered', '')} reused={slides.get('cached', '')}"
+        )
+    for build, output in manifest.data['outputs'].items():
+        print(f"{build}: {output['video']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--build', type=parse_build, action='append', default=[], metavar='NAME=ARGS', help='a build, can be repeated')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of manim processes')
+    parser.add_argument('--retries', type=int, default=1, help='times a failed job is run again')
+    parser.add_argument('--status', action='store_true', help='print the manifest and exit')
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        return
+    if not args.build:
+        parser.error('at least one --build is needed')
+    run(dict(args.build), args.workers, args.retries)
+
+
+if __name__ == '__main__':
+    main()
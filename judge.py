@@ -0,0 +1,105 @@
+"""Answer queries in the contest format, fast enough for multi-megabyte tests.
+
+    python judge.py < input.txt > output.txt
+
+The input is the number of queries followed by the n of every query (or only
+the n with --no-count). Every answer is the expected coverage sum_n / cnt_n
+modulo 10^9 + 7 (or --mod, which must be prime), one per line.
+
+A query whose cnt_n is 0 modulo the prime has no answer: its line is -1, the
+query is reported on stderr and the exit status is 1, once all the other
+queries are answered.
+
+The input is read and answered by chunks: all the queries of a chunk are
+solved together (with NumPy when it is installed), and all their cnt_n are
+inverted with a single modular exponentiation.
+"""
+import argparse
+import sys
+
+import solver
+
+CHUNK_SIZE = 1 << 20
+
+
+def read_numbers(stream, chunk_size=CHUNK_SIZE):
+    """The integers of a binary stream, as one list per chunk."""
+    rest = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        tokens = (rest + chunk).split()
+        rest = b''
+        # the last number may go on in the next chunk
+        if tokens and not chunk[-1:].isspace():
+            rest = tokens.pop()
+        yield [int(token) for token in tokens]
+    if rest:
+        yield [int(rest)]
+
+
+def read_queries(stream, with_count=True, chunk_size=CHUNK_SIZE):
+    remaining = None
+    for numbers in read_numbers(stream, chunk_size):
+        if with_count and remaining is None:
+            if not numbers:
+                continue
+            remaining = numbers[0]
+            numbers = numbers[1:]
+        if remaining is not None:
+            numbers = numbers[:remaining]
+            remaining -= len(numbers)
+        if numbers:
+            yield numbers
+        if remaining == 0:
+            break
+
+
+NO_ANSWER = -1
+
+
+def answer(engine, ns):
+    mod = engine.mod
+    if engine.vectorizable:
+        cnt, total = engine.solve_array(ns)
+        cnt, total = cnt.tolist(), total.tolist()
+    else:
+        pairs = engine.solve_many(ns)
+        cnt = [x for x, _ in pairs]
+        total = [x for _, x in pairs]
+    inverses = solver.batch_inverse(cnt, mod, zeros=True)
+    return [NO_ANSWER if inv is None else x * inv % mod for x, inv in zip(total, inverses)]
+
+
+def run(stdin, stdout, mod=solver.MOD, with_count=True, chunk_size=CHUNK_SIZE, stderr=sys.stderr):
+    """Answer all the queries, returns the number of those without an answer."""
+    engine = solver.Engine(mod)
+    done = 0
+    failed = 0
+    for ns in read_queries(stdin, with_count, chunk_size):
+        answers = answer(engine, ns)
+        for i, (n, x) in enumerate(zip(ns, answers)):
+            if x == NO_ANSWER:
+                failed += 1
+                stderr.write(f'query {done + i + 1} (n = {n}): cnt_n is 0 modulo {mod}, no answer\n')
+        done += len(ns)
+        stdout.write('\n'.join(map(str, answers)).encode() + b'\n')
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mod', type=int, default=solver.MOD)
+    parser.add_argument('--no-count', dest='with_count', action='store_false', help='the input has no number of queries first')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='bytes read at once')
+    args = parser.parse_args()
+
+    failed = run(sys.stdin.buffer, sys.stdout.buffer, args.mod, args.with_count, args.chunk_size)
+    sys.stdout.flush()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Encode smaller versions of the video while rendering the master one.
+
+Enabled with PROXIES=720p30[,...] (see tutorial.py). Every frame is still
+rasterized once, at the master resolution, and the ffmpeg process writing a
+partial movie gets one more output per proxy, scaled and decimated by ffmpeg:
+the file writer opens its pipe with the command of movie_command(), which is
+Manim's own plus the proxy outputs. This needs a file writer piping raw frames
+to ffmpeg (the one of Manim < 0.18) and an mp4 render; a proxy missing after
+the render is an error. At the end the proxy partial movies are concatenated into
+videos/<module>/<proxy>/<Scene>.mp4, and the slides of the scene are written
+again as slides/<Scene>_<proxy>.json with the proxy movies, so that
+`manim-slides <Scene>_<proxy>` presents the proxy.
+"""
+import inspect
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+from manim import __version__ as manim_version
+from manim import config
+
+SLIDES_DIR = Path('slides')
+
+
+def parse_proxies(spec):
+    proxies = []
+    for name in filter(None, (x.strip() for x in spec.split(','))):
+        match = re.fullmatch(r'(\d+)p(\d+)', name)
+        if match is None:
+            raise ValueError(f'proxies look like 720p30, got {name!r}')
+        proxies.append((name, int(match[1]), int(match[2])))
+    return proxies
+
+
+def is_opengl():
+    return str(getattr(config.renderer, 'value', config.renderer)) == 'opengl'
+
+
+def encoder_args(height, fps, flip=False):
+    filters = f'vflip,scale=-2:{height}' if flip else f'scale=-2:{height}'
+    return ['-an', '-vf', filters, '-r', str(fps), '-vcodec', 'libx264', '-pix_fmt', 'yuv420p']
+
+
+def movie_command(file_path, width, height, fps):
+    """The ffmpeg command Manim's open_movie_pipe runs for a partial movie."""
+    command = [
+        config.ffmpeg_executable, '-y',
+        '-f', 'rawvideo', '-s', f'{width}x{height}', '-pix_fmt', 'rgba', '-r', str(fps), '-i', '-',
+        '-an', '-loglevel', config.ffmpeg_loglevel.lower(),
+        '-metadata', f'comment=Rendered with Manim Community v{manim_version}',
+    ]
+    if is_opengl():
+        command += ['-vf', 'vflip']
+    if config.movie_file_extension == '.webm':
+        command += ['-vcodec', 'libvpx-vp9', '-auto-alt-ref', '0']
+    elif config.transparent:
+        command += ['-vcodec', 'qtrle']
+    else:
+        command += ['-vcodec', 'libx264', '-pix_fmt', 'yuv420p']
+    return command + [str(file_path)]
+
+
+def transcode(src, dst, height, fps):
+    subprocess.run([config.ffmpeg_executable, '-y', '-loglevel', 'error', '-i', str(src), *encoder_args(height, fps), str(dst)], check=True)
+
+
+def concat(videos, output):
+    output.parent.mkdir(parents=True, exist_ok=True)
+    list_file = output.with_suffix('.txt')
+    with open(list_file, 'w') as f:
+        for video in videos:
+            f.write(f"file '{Path(video).resolve().as_posix()}'\n")
+    subprocess.run([
+        config.ffmpeg_executable, '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_file), '-c', 'copy', str(output),
+    ], check=True)
+    list_file.unlink()
+
+
+class MultiOutput:
+    def __init__(self, scene, proxies, holds=None):
+        self.scene = scene
+        self.proxies = proxies
+        self.holds = holds
+        self.file_writer = file_writer = scene.renderer.file_writer
+        # partial movies written by this render, their proxies must be there
+        self.written = set()
+
+        end_animation = file_writer.end_animation
+
+        def open_pipe_with_proxies(file_path=None):
+            if file_path is None:
+                file_path = file_writer.partial_movie_files[scene.renderer.num_plays]
+            file_writer.partial_movie_file_path = file_path
+            fps = config.frame_rate
+            fps = int(fps) if fps == int(fps) else fps
+            if is_opengl():
+                width, height = scene.renderer.get_pixel_shape()
+            else:
+                width, height = config.pixel_width, config.pixel_height
+            command = movie_command(file_path, width, height, fps)
+            for name, proxy_height, proxy_fps in self.proxies:
+                command += [*encoder_args(proxy_height, proxy_fps, flip=is_opengl()), str(self.proxy_path(file_path, name))]
+            self.written.add(str(file_path))
+            file_writer.writing_process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+        def end(allow_write=False):
+            end_animation(allow_write)
+            # a hold was added to the master after the pipe was closed
+            if allow_write and self.holds is not None and self.holds.last_hold > 0:
+                master = file_writer.partial_movie_files[scene.renderer.num_plays]
+                for name, height, fps in self.proxies:
+                    transcode(master, self.proxy_path(master, name), height, fps)
+
+        file_writer.open_movie_pipe = open_pipe_with_proxies
+        file_writer.end_animation = end
+
+    def proxy_path(self, master, name):
+        master = Path(master)
+        path = master.parent / name / master.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def proxy_partial_movies(self, name, height, fps):
+        movies = []
+        for master in self.file_writer.partial_movie_files:
+            if master is None:
+                continue
+            proxy = self.proxy_path(master, name)
+            if not proxy.exists():
+                if str(master) in self.written:
+                    raise RuntimeError(
+                        f'{proxy} was not written along with {master}: '
+                        'the file writer did not open its pipe through open_movie_pipe'
+                    )
+                # cached master partial movie from an earlier render, not written here
+                transcode(master, proxy, height, fps)
+            movies.append(proxy)
+        return movies
+
+    def finish(self):
+        """Concatenate the proxies and write their slides, after the scene is rendered."""
+        scene_name = type(self.scene).__name__
+        movie = Path(self.file_writer.movie_file_path)
+        slides_file = SLIDES_DIR / f'{scene_name}.json'
+        slides = None
+        if slides_file.exists():
+            with open(slides_file) as f:
+                slides = json.load(f)
+
+        for name, height, fps in self.proxies:
+            movies = self.proxy_partial_movies(name, height, fps)
+            if len(movies) == 0:
+                continue
+            concat(movies, movie.parent.parent / name / movie.name)
+            if slides is None:
+                continue
+            # same slides, with the proxy version of every partial movie
+            files_dir = SLIDES_DIR / 'files' / f'{scene_name}_{name}'
+            files_dir.mkdir(parents=True, exist_ok=True)
+            # one slides file per partial movie, in the same order
+            if len(slides['files']) != len(movies):
+                raise RuntimeError(f"{slides_file} has {len(slides['files'])} files for {len(movies)} partial movies")
+            files = []
+            for file, proxy in zip(slides['files'], movies):
+                dst = files_dir / Path(file).name
+                shutil.copyfile(proxy, dst)
+                files.append(str(dst))
+            with open(SLIDES_DIR / f'{scene_name}_{name}.json', 'w') as f:
+                json.dump({**slides, 'files': files}, f, indent=2)
+
+
+def install(scene, proxies, holds=None):
+    if len(proxies) == 0:
+        return None
+    if not hasattr(scene.renderer.file_writer, 'close_movie_pipe') or hasattr(inspect.getmodule(type(scene.renderer.file_writer)), 'av'):
+        # PyAV based writers encode in process, there is no ffmpeg command to add outputs to
+        raise RuntimeError('PROXIES need a file writer piping its frames to ffmpeg (Manim < 0.18)')
+    if config.movie_file_extension != '.mp4' or config.transparent:
+        # the proxies are H.264 outputs of the same ffmpeg, named like the master movie
+        raise RuntimeError(f'PROXIES need an mp4 render, not {config.movie_file_extension}' + (' (transparent)' if config.transparent else ''))
+    return MultiOutput(scene, proxies, holds)
@@ -0,0 +1,100 @@
+"""Single video export of the slides, for presenting from slow machines.
+
+    python presenter.py [SCENE]
+
+Reads slides/<SCENE>.json (HallwayTilingTutorial by default) after a render,
+and encodes all its partial movies again as one video, with a keyframe forced
+at the first frame of every slide, so seeking to a slide never decodes frames
+of the previous ones. Next to it, <SCENE>.index.json gives the first and last
+frame and the start and end time of every slide:
+
+    {"fps": 60, "frames": 12345, "slides": [[0, 0, 0.0, 2.5, "loop"], ...]}
+
+with one [number, first_frame, start, end, type] per slide.
+"""
+import argparse
+import json
+import subprocess
+from fractions import Fraction
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SLIDES_DIR = HERE / 'slides'
+OUTPUT_DIR = HERE / 'media' / 'videos' / 'presenter'
+DECK = 'HallwayTilingTutorial'
+
+
+def probe(video):
+    """(number of frames, frame rate) of a video."""
+    result = subprocess.run([
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+        '-show_entries', 'stream=nb_read_packets,r_frame_rate', '-of', 'json', str(video),
+    ], check=True, capture_output=True, text=True)
+    stream = json.loads(result.stdout)['streams'][0]
+    return int(stream['nb_read_packets']), Fraction(stream['r_frame_rate'])
+
+
+def slide_frames(slides, frame_counts):
+    """First frame and number of frames of every slide."""
+    starts = [0]
+    for count in frame_counts:
+        starts.append(starts[-1] + count)
+    return [
+        (starts[slide['start_animation']], starts[slide['end_animation']] - starts[slide['start_animation']])
+        for slide in slides
+    ]
+
+
+def encode(files, output, keyframes, fps):
+    output.parent.mkdir(parents=True, exist_ok=True)
+    list_file = output.with_suffix('.txt')
+    with open(list_file, 'w') as f:
+        for file in files:
+            f.write(f"file '{Path(file).resolve().as_posix()}'\n")
+    # half a frame early, so rounding never pushes the keyframe to the next frame
+    times = ','.join(f'{float((frame - Fraction(1, 2)) / fps):.6f}' for frame in keyframes if frame > 0)
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_file),
+        '-an', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p',
+        *(['-force_key_frames', times] if times else []),
+        '-movflags', '+faststart', str(output),
+    ], check=True)
+    list_file.unlink()
+    return output
+
+
+def export(scene=DECK, output_dir=OUTPUT_DIR):
+    with open(SLIDES_DIR / f'{scene}.json') as f:
+        deck = json.load(f)
+    files = [SLIDES_DIR.parent / file if not Path(file).is_absolute() else Path(file) for file in deck['files']]
+    probed = [probe(file) for file in files]
+    fps = probed[0][1]
+    frames = slide_frames(deck['slides'], [count for count, _ in probed])
+
+    video = encode(files, output_dir / f'{scene}.mp4', [first for first, _ in frames], fps)
+    index = {
+        'fps': float(fps),
+        'frames': sum(count for count, _ in probed),
+        'slides': [
+            [slide['number'], first, round(float(first / fps), 6), round(float((first + count) / fps), 6), slide['type']]
+            for slide, (first, count) in zip(deck['slides'], frames)
+        ],
+    }
+    index_path = output_dir / f'{scene}.index.json'
+    with open(index_path, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    return video, index_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scene', nargs='?', default=DECK)
+    args = parser.parse_args()
+    video, index = export(args.scene)
+    print(f'Video: {video}')
+    print(f'Index: {index}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""The recurrence of the problem, written once, and what is generated from it.
+
+A spec gives, for every way the last pieces of a tiling can end, the number of
+such endings and the number of cells they cover:
+
+    cnt_i = sum_k coefficients[k] * cnt_{i - 1 - k}
+    sum_i = sum_k coefficients[k] * (sum_{i - 1 - k} + weights[k] * cnt_{i - 1 - k})
+
+compile_spec turns a spec into the formula of the deck (its MathTex parts,
+with names for the parts the slides animate), the transition matrix as typeset
+in the deck (MATRIX_TEXT) and the numeric one used by solver.py. It is cached,
+every spec is compiled once per process.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class Spec(NamedTuple):
+    coefficients: tuple
+    weights: tuple
+    count: str = 'cnt'
+    total: str = 'sum'
+
+
+# The endings of dp_formula: the last column alone (1 way, no piece), one L
+# piece over the last 2 columns (4 rotations, 3 cells), two L pieces over the
+# last 3 columns (2 ways, 6 cells).
+HALLWAY = Spec(coefficients=(1, 4, 2), weights=(0, 3, 6))
+
+SPEC = HALLWAY
+
+
+def label(name, var, offset=0):
+    """cnt_i, cnt_{i - 1}, and cnt_0, cnt_{- 1} for the base values."""
+    if offset == 0:
+        return f'{name}_{var}'
+    if var == '0':
+        return f'{name}_{{- {offset}}}'
+    return f'{name}_{{{var} - {offset}}}'
+
+
+def product_tex(*factors):
+    factors = [f for f in factors if f != 1]
+    if any(f == 0 for f in factors):
+        return '0'
+    return r' \cdot '.join(map(str, factors)) or '1'
+
+
+class Formula:
+    """The parts of the recurrence MathTex, in order, with names for some of them.
+
+    Names are '<row>.<what>' or '<row>.<what>.<k>', row being 'cnt', 'sum' or
+    'cover' for the coverage line (whatever the names of the spec are), what
+    being one of lhs, eq, plus, coef, cdot, weight, wcdot, prev.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.index = {}
+        self.last_is_text = False
+
+    def group(self, tex, name=None):
+        self.parts.append(tex)
+        self.last_is_text = False
+        if name is not None:
+            self.index[name] = len(self.parts) - 1
+
+    def text(self, tex, name=None):
+        # text between two groups ends up in a single part, like with {{ }}
+        if self.last_is_text:
+            self.parts[-1] += ' ' + tex
+        else:
+            self.parts.append(tex)
+        self.last_is_text = True
+        if name is not None:
+            self.index[name] = len(self.parts) - 1
+
+    def __getitem__(self, name):
+        return self.index[name]
+
+    def span(self, first, last=None):
+        """Slice of the parts from first to last (included)."""
+        return slice(self.index[first], self.index[last or first] + 1)
+
+    def cell(self, row, k):
+        """The parts which become the matrix cell of term k of row, None if the term is 0."""
+        if row == 'cover':
+            if f'cover.weight.{k}' not in self.index:
+                return None
+            first = f'cover.coef.{k}' if f'cover.coef.{k}' in self.index else f'cover.weight.{k}'
+            return self.span(first, f'cover.weight.{k}')
+        if f'{row}.prev.{k}' not in self.index:
+            return None
+        return self.span(f'{row}.coef.{k}' if f'{row}.coef.{k}' in self.index else f'{row}.prev.{k}')
+
+    def require(self, names, what):
+        missing = [name for name in names if name not in self.index]
+        if missing:
+            raise ValueError(f'{what} can not show this spec, its formula has no {", ".join(missing)}')
+
+
+def build_formula(spec):
+    formula = Formula()
+    for row, name in (('cnt', spec.count), ('sum', spec.total)):
+        if row == 'sum':
+            formula.text(r'\\')
+        formula.group(label(name, 'i'), f'{row}.lhs')
+        formula.text('& =', f'{row}.eq')
+        for k, coef in enumerate(spec.coefficients):
+            if k > 0:
+                formula.text('& &')
+            if coef == 0:
+                continue
+            if k > 0:
+                formula.text('+', f'{row}.plus.{k}')
+            if coef != 1:
+                formula.group(str(coef), f'{row}.coef.{k}')
+                formula.text(r'\cdot', f'{row}.cdot.{k}')
+            formula.group(label(name, 'i', k + 1), f'{row}.prev.{k}')
+
+    if any(coef != 0 and weight != 0 for coef, weight in zip(spec.coefficients, spec.weights)):
+        formula.text(r'\\ &')
+        for k, (coef, weight) in enumerate(zip(spec.coefficients, spec.weights)):
+            if k > 0:
+                formula.text('& &')
+            if coef == 0 or weight == 0:
+                continue
+            formula.text('+', f'cover.plus.{k}')
+            if coef != 1:
+                formula.group(str(coef), f'cover.coef.{k}')
+                formula.text(r'\cdot', f'cover.cdot.{k}')
+            formula.group(str(weight), f'cover.weight.{k}')
+            formula.text(r'\cdot', f'cover.wcdot.{k}')
+            formula.group(label(spec.count, 'i', k + 1), f'cover.prev.{k}')
+    return formula
+
+
+def build_matrix_text(spec):
+    order = len(spec.coefficients)
+    names = (spec.count, spec.total)
+    header = ('~', *(label(name, 'i', k + 1) for name in names for k in range(order)))
+    rows = [header]
+    for r, name in enumerate(names):
+        for j in range(order):
+            cells = ['0'] * (2 * order)
+            if j > 0:
+                # shifting the window: x_{i - j} is the x_{i - j} of the previous step
+                cells[r * order + j - 1] = '1'
+            else:
+                for k, coef in enumerate(spec.coefficients):
+                    cells[r * order + k] = str(coef)
+                    if name == spec.total:
+                        cells[k] = product_tex(coef, spec.weights[k])
+            rows.append((label(name, 'i', j), *cells))
+    return rows
+
+
+def cell_value(cell):
+    value = 1
+    for factor in cell.split(r'\cdot'):
+        value *= int(factor)
+    return value
+
+
+class Compiled:
+    def __init__(self, spec):
+        self.spec = spec
+        self.order = len(spec.coefficients)
+        self.formula = build_formula(spec)
+        self.matrix_text = build_matrix_text(spec)
+        self.transition = tuple(tuple(cell_value(cell) for cell in row[1:]) for row in self.matrix_text[1:])
+        self.size = 2 * self.order
+        # cnt_0 = 1 (the empty tiling), everything else 0
+        self.base = tuple(int(i == 0) for i in range(self.size))
+        self.cnt, self.sum = 0, self.order
+
+    def state_labels(self, var):
+        """Labels of the state vector at step var: cnt_n, cnt_{n - 1}, ..., sum_n, ..."""
+        return [label(name, var, k) for name in (self.spec.count, self.spec.total) for k in range(self.order)]
+
+
+@lru_cache(maxsize=None)
+def compile_spec(spec=SPEC):
+    return Compiled(spec)
@@ -0,0 +1,227 @@
+"""Render the sections of the deck in parallel, then glue them back together.
+
+    python render.py [-j JOBS] [any manim flag, e.g. -qm]
+    python render.py --draft [--from SECTION|SLIDE] [--upto SLIDE]
+    python render.py --trace DIR
+    python render.py --proxies 720p30[,...]
+    python render.py --incremental
+    python render.py --stills DIR
+    python render.py --presenter
+
+Every section scene of tutorial.py is rendered by its own manim process. The
+section videos are concatenated into the usual HallwayTilingTutorial.mp4 and
+their slide files are merged into slides/HallwayTilingTutorial.json, so
+`manim-slides HallwayTilingTutorial` works like after a normal render.
+
+--draft renders in low quality. With --from/--upto only the part of the deck
+between those slides is rendered, as a single HallwayTilingTutorial scene (see
+the DRAFT_* variables in tutorial.py). Slide files of such partial renders are
+not meant for presenting.
+
+--trace writes the timing of every play of every scene to DIR/<scene>.csv (see
+render_trace.py).
+
+--proxies also encodes smaller versions of the deck in the same pass (see
+multi_output.py), glued into videos/tutorial/<proxy>/HallwayTilingTutorial.mp4
+and slides/HallwayTilingTutorial_<proxy>.json.
+
+--incremental only renders the slides whose content changed since the last
+render (see slide_cache.py).
+
+--stills renders no video, only one PNG per slide (see stills.py). The stills
+of the sections are renumbered into DIR/HallwayTilingTutorial/, with a
+manifest.json listing the slide, section and file of each.
+
+--presenter also exports the deck as a single video with a keyframe at the
+start of every slide, and an index of the slide timestamps (see presenter.py).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import presenter
+import tex_cache
+
+HERE = Path(__file__).resolve().parent
+MODULE = 'tutorial'
+DECK = 'HallwayTilingTutorial'
+SECTION_SCENES = ['IntroSection', 'ProblemStatementSection', 'DpFormulaSection', 'DpOptimizationSection']
+
+MEDIA_DIR = HERE / 'media'
+SLIDES_DIR = HERE / 'slides'
+
+
+def section_media_dir(scene):
+    # every section gets its own media dir, so the processes never write the
+    # same TeX/partial movie files at the same time
+    return MEDIA_DIR / 'sections' / scene
+
+
+def run_manim(scene, manim_args=(), env=None):
+    cmd = [
+        sys.executable, '-m', 'manim', f'{MODULE}.py', scene,
+        '--media_dir', str(section_media_dir(scene)),
+        *manim_args,
+    ]
+    subprocess.run(cmd, cwd=HERE, check=True, env=None if env is None else {**os.environ, **env})
+
+
+def render_scene(scene, manim_args=(), env=None):
+    run_manim(scene, manim_args, env)
+    return find_video(scene)
+
+
+def find_video(scene):
+    videos = section_media_dir(scene).glob(f'videos/{MODULE}/*/{scene}.mp4')
+    return max(videos, key=os.path.getmtime)
+
+
+def proxy_names(env):
+    return [name for name in (env or {}).get('PROXIES', '').split(',') if name]
+
+
+def concat_videos(videos, output):
+    output.parent.mkdir(parents=True, exist_ok=True)
+    list_file = output.with_suffix('.txt')
+    with open(list_file, 'w') as f:
+        for video in videos:
+            f.write(f"file '{Path(video).resolve().as_posix()}'\n")
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_file),
+        '-c', 'copy', str(output),
+    ], check=True)
+    list_file.unlink()
+    return output
+
+
+def merge_slides(scenes, output=DECK, slides_dir=SLIDES_DIR):
+    merged = None
+    slides = []
+    files = []
+    for scene in scenes:
+        with open(slides_dir / f'{scene}.json') as f:
+            part = json.load(f)
+        if merged is None:
+            merged = dict(part)
+        offset = len(files)
+        part_slides = [dict(slide) for slide in part['slides']]
+        for slide in part_slides:
+            slide['start_animation'] += offset
+            slide['end_animation'] += offset
+        # The previous section ended with its 'last' slide. In the single scene
+        # render those animations belong to the first slide of this section.
+        if len(slides) > 0 and slides[-1]['type'] == 'last' and len(part_slides) > 0:
+            part_slides[0]['start_animation'] = slides.pop()['start_animation']
+        slides.extend(part_slides)
+        files.extend(part['files'])
+
+    for i, slide in enumerate(slides):
+        slide['number'] = i + 1
+    merged['slides'] = slides
+    merged['files'] = files
+
+    path = slides_dir / f'{output}.json'
+    with open(path, 'w') as f:
+        json.dump(merged, f, indent=2)
+    return path
+
+
+def render_all(scenes=SECTION_SCENES, jobs=None, manim_args=(), env=None):
+    jobs = jobs or min(len(scenes), os.cpu_count() or 1)
+    # compile the TeX of all sections once, before the processes start
+    tex_cache.collect()
+    # the real work happens in the manim processes, threads are enough to wait on them
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        videos = list(pool.map(lambda scene: render_scene(scene, manim_args, env), scenes))
+
+    quality = videos[0].parent.name
+    video = concat_videos(videos, MEDIA_DIR / 'videos' / MODULE / quality / f'{DECK}.mp4')
+    slides = merge_slides(scenes)
+    for proxy in proxy_names(env):
+        proxy_videos = [video.parent.parent / proxy / video.name for video in videos]
+        concat_videos(proxy_videos, MEDIA_DIR / 'videos' / MODULE / proxy / f'{DECK}.mp4')
+        merge_slides([f'{scene}_{proxy}' for scene in scenes], f'{DECK}_{proxy}')
+    return video, slides
+
+def merge_stills(scenes, directory, output=DECK):
+    directory = Path(directory)
+    output_dir = directory / output
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = []
+    for scene in scenes:
+        with open(directory / scene / 'manifest.json') as f:
+            part = json.load(f)
+        for still in part:
+            name = f'{len(manifest):03}.png'
+            shutil.copyfile(directory / scene / still['file'], output_dir / name)
+            manifest.append({'slide': len(manifest), 'section': still['section'], 'file': name})
+    path = output_dir / 'manifest.json'
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def render_stills(directory, scenes=SECTION_SCENES, jobs=None, manim_args=(), env=None):
+    jobs = jobs or min(len(scenes), os.cpu_count() or 1)
+    env = {**(env or {}), 'STILLS': str(Path(directory).resolve())}
+    tex_cache.collect()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(lambda scene: run_manim(scene, manim_args, env), scenes))
+    return merge_stills(scenes, directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of manim processes (default: one per section, up to the cpu count)')
+    parser.add_argument('--draft', action='store_true', help='render in low quality')
+    parser.add_argument('--from', dest='start', metavar='SECTION|SLIDE', help='start from this section or slide number')
+    parser.add_argument('--upto', metavar='SLIDE', help='stop after this slide number')
+    parser.add_argument('--trace', metavar='DIR', help='write the timing of every play to DIR/<scene>.csv')
+    parser.add_argument('--proxies', metavar='720p30[,...]', help='also encode these smaller versions')
+    parser.add_argument('--incremental', action='store_true', help='only render the slides that changed')
+    parser.add_argument('--stills', metavar='DIR', help='only write one PNG per slide into DIR')
+    parser.add_argument('--presenter', action='store_true', help='also export a single video with a keyframe at every slide')
+    args, manim_args = parser.parse_known_args()
+
+    env = {}
+    if args.incremental:
+        env['INCREMENTAL'] = '1'
+    if args.proxies is not None:
+        env['PROXIES'] = args.proxies
+    if args.trace is not None:
+        env['RENDER_TRACE'] = str(Path(args.trace).resolve() / '{scene}.csv')
+    if args.draft:
+        env['DRAFT'] = '1'
+    if args.start is not None or args.upto is not None:
+        env['DRAFT_FROM'] = args.start or ''
+        env['DRAFT_UPTO'] = args.upto or ''
+        tex_cache.collect()
+        if args.stills is not None:
+            env['STILLS'] = str(Path(args.stills).resolve())
+            run_manim(DECK, manim_args, env)
+            print(f'Stills: {Path(args.stills) / DECK}')
+            return
+        print(f'Video: {render_scene(DECK, manim_args, env)}')
+        return
+
+    if args.stills is not None:
+        print(f'Stills: {render_stills(args.stills, jobs=args.jobs, manim_args=manim_args, env=env)}')
+        return
+
+    video, slides = render_all(jobs=args.jobs, manim_args=manim_args, env=env)
+    print(f'Video: {video}')
+    print(f'Slides: {slides}')
+    if args.presenter:
+        video, index = presenter.export(DECK)
+        print(f'Presenter video: {video}')
+        print(f'Presenter index: {index}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""What the render settings cost: every section scene under every combination of
+renderer, resolution and frame rate.
+
+    python render_bench.py [--renderers cairo,opengl] [--resolutions 1080p,720p,480p] [--fps 60,30,15]
+                           [--sections IntroSection,...] [--save-baseline] [--max-slowdown 0.2]
+
+Every run is a fresh manim process (with manim's cache disabled, the TeX cache
+is warm) working in media/bench/<settings>/<scene>, where its video and slides
+go. For each one it records the wall time, the frames rendered per second of
+wall time, the peak RSS of the process and the size of the video. The rows are appended to
+media/bench/results.csv, with the commit they were measured on, and printed as
+a table.
+
+With --save-baseline the results become render_baseline.json. Otherwise they
+are compared to it, and the script fails if a run got slower than the baseline
+by more than --max-slowdown, used more memory than --max-memory-growth more,
+or wrote a video bigger by more than --max-size-growth.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import tex_cache
+from presenter import probe
+from render import MODULE, SECTION_SCENES
+
+HERE = Path(__file__).resolve().parent
+BENCH_DIR = HERE / 'media' / 'bench'
+RESULTS = BENCH_DIR / 'results.csv'
+BASELINE = HERE / 'render_baseline.json'
+
+RESOLUTIONS = {
+    '2160p': (3840, 2160),
+    '1080p': (1920, 1080),
+    '720p': (1280, 720),
+    '480p': (854, 480),
+}
+
+FIELDS = ['commit', 'scene', 'renderer', 'resolution', 'fps', 'status', 'wall_time', 'frames', 'render_fps', 'peak_rss_mib', 'size_mib']
+
+
+def commit():
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True)
+    return result.stdout.strip() or 'unknown'
+
+
+def settings_name(renderer, resolution, fps):
+    return f'{renderer}-{resolution}-{fps}'
+
+
+def run(scene, renderer, resolution, fps):
+    width, height = RESOLUTIONS[resolution]
+    media_dir = BENCH_DIR / settings_name(renderer, resolution, fps) / scene
+    media_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        sys.executable, '-m', 'manim', str(HERE / f'{MODULE}.py'), scene,
+        '--config_file', str(HERE / 'manim.cfg'),
+        '--renderer', renderer, '--write_to_movie',
+        '-r', f'{width},{height}', '--fps', str(fps),
+        '--media_dir', str(media_dir), '--disable_caching',
+        '--progress_bar', 'none', '-v', 'WARNING',
+    ]
+    row = {'scene': scene, 'renderer': renderer, 'resolution': resolution, 'fps': fps}
+    start = time.perf_counter()
+    # the slides files of manim-slides are written to the working directory,
+    # not over the slides of the deck
+    process = subprocess.Popen(cmd, cwd=media_dir)
+    # wait4 gives the resource usage of this child alone
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    row['wall_time'] = round(time.perf_counter() - start, 2)
+    # ru_maxrss is in KiB on Linux
+    row['peak_rss_mib'] = round(usage.ru_maxrss / 1024, 1)
+
+    videos = list(media_dir.glob(f'videos/{MODULE}/*/{scene}.mp4'))
+    if process.returncode != 0 or len(videos) == 0:
+        row['status'] = 'failed'
+        return row
+    row['status'] = 'ok'
+    row['frames'], _ = probe(videos[0])
+    row['render_fps'] = round(row['frames'] / row['wall_time'], 1)
+    row['size_mib'] = round(videos[0].stat().st_size / 2**20, 2)
+    return row
+
+
+def save_results(rows):
+    RESULTS.parent.mkdir(parents=True, exist_ok=True)
+    new = not RESULTS.exists()
+    with open(RESULTS, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(rows):
+    widths = {field: max(len(field), *(len(str(row.get(field, ''))) for row in rows)) for field in FIELDS}
+    print('  '.join(field.ljust(widths[field]) for field in FIELDS))
+    for row in rows:
+        print('  '.join(str(row.get(field, '')).ljust(widths[field]) for field in FIELDS))
+
+
+def row_key(row):
+    return f"{row['scene']}/{settings_name(row['renderer'], row['resolution'], row['fps'])}"
+
+
+def regressions(rows, baseline, max_slowdown, max_memory_growth, max_size_growth):
+    found = []
+    for row in rows:
+        base = baseline.get(row_key(row))
+        if base is None:
+            continue
+        if row['status'] != 'ok':
+            if base['status'] == 'ok':
+                found.append(f'{row_key(row)}: failed')
+            continue
+        for field, limit in (('wall_time', max_slowdown), ('peak_rss_mib', max_memory_growth), ('size_mib', max_size_growth)):
+            if base.get(field) and row[field] > base[field] * (1 + limit):
+                found.append(f'{row_key(row)}: {field} {base[field]} -> {row[field]}')
+    return found
+
+
+def split(value):
+    return [x for x in value.split(',') if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--renderers', type=split, default=['cairo', 'opengl'])
+    parser.add_argument('--resolutions', type=split, default=['1080p', '720p', '480p'], help=f'any of {", ".join(RESOLUTIONS)}')
+    parser.add_argument('--fps', type=lambda value: [int(x) for x in split(value)], default=[60, 30, 15])
+    parser.add_argument('--sections', type=split, default=SECTION_SCENES)
+    parser.add_argument('--save-baseline', action='store_true', help=f'write the results to {BASELINE.name}')
+    parser.add_argument('--max-slowdown', type=float, default=0.2, help='allowed wall time growth (default: 0.2, 20%%)')
+    parser.add_argument('--max-memory-growth', type=float, default=0.2, help='allowed peak RSS growth (default: 0.2)')
+    parser.add_argument('--max-size-growth', type=float, default=0.1, help='allowed video size growth (default: 0.1)')
+    args = parser.parse_args()
+
+    tex_cache.collect()
+    current = commit()
+    rows = []
+    for renderer in args.renderers:
+        for resolution in args.resolutions:
+            for fps in args.fps:
+                for scene in args.sections:
+                    row = {'commit': current, **run(scene, renderer, resolution, fps)}
+                    rows.append(row)
+                    print(f"{row_key(row)}: {row['status']}, {row['wall_time']}s", flush=True)
+    save_results(rows)
+    print_table(rows)
+
+    if args.save_baseline:
+        with open(BASELINE, 'w') as f:
+            json.dump({row_key(row): row for row in rows}, f, indent=2)
+        print(f'Baseline: {BASELINE}')
+        return
+    if not BASELINE.exists():
+        return
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    found = regressions(rows, baseline, args.max_slowdown, args.max_memory_growth, args.max_size_growth)
+    if found:
+        sys.exit('regressions against the baseline:\n' + '\n'.join(found))
+    print('no regression against the baseline')
+
+
+if __name__ == '__main__':
+    main()
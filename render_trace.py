@@ -0,0 +1,128 @@
+"""Timing of every play() call of a render.
+
+Enabled with RENDER_TRACE=<file> (.json or .csv), see tutorial.py. For every
+play (and so every wait and clear) it records:
+
+- the section and the slide (number of pause() before it)
+- the animation types and the number of mobjects on screen (top level and
+  with all their submobjects)
+- the number of frames written (with the frames of a static hold, which are
+  piped once and cloned by ffmpeg, see static_frames.py)
+- the wall time, split into building SVG mobjects (Tex, MathTex, Text, with
+  their LaTeX or Pango run and the parts of a MathTex; counted from the
+  previous play, this is where the mobjects of this one are built),
+  rasterizing frames, and sending them to the encoder.
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+FIELDS = [
+    'play', 'section', 'slide', 'animations', 'mobjects', 'family_size', 'frames',
+    'svg_time', 'raster_time', 'encode_time', 'play_time',
+]
+
+_svg_time = 0.0
+_svg_depth = 0
+
+
+def install_svg_timer():
+    from manim import MarkupText, MathTex, SingleStringMathTex, SVGMobject, Tex, Text
+
+    # Tex and Text run LaTeX / Pango before their SVGMobject.__init__, so their
+    # own __init__ is timed too (the outermost one counts, see timed_init)
+    for cls in (SVGMobject, SingleStringMathTex, MathTex, Tex, Text, MarkupText):
+        if '__init__' in vars(cls) and not getattr(cls.__init__, 'timed', False):
+            cls.__init__ = timed(cls.__init__)
+
+
+def timed(init):
+    def timed_init(self, *args, **kwargs):
+        global _svg_time, _svg_depth
+        _svg_depth += 1
+        start = time.perf_counter()
+        try:
+            init(self, *args, **kwargs)
+        finally:
+            _svg_depth -= 1
+            # only the outermost one, a mobject can build others while it is built
+            if _svg_depth == 0:
+                _svg_time += time.perf_counter() - start
+
+    timed_init.timed = True
+    return timed_init
+
+
+def animation_name(animation):
+    name = type(animation).__name__
+    # mobject.animate
+    return 'animate' if name == '_AnimationBuilder' else name
+
+
+class Timer:
+    def __init__(self):
+        self.time = 0.0
+        self.calls = 0
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.time += time.perf_counter() - start
+                self.calls += 1
+        return timed
+
+
+class RenderTrace:
+    def __init__(self, scene, path, holds=None):
+        self.path = Path(path)
+        self.holds = holds
+        self.records = []
+        self.raster = Timer()
+        self.encode = Timer()
+        install_svg_timer()
+        renderer = scene.renderer
+        renderer.update_frame = self.raster.wrap(renderer.update_frame)
+        renderer.file_writer.write_frame = self.encode.wrap(renderer.file_writer.write_frame)
+        self.svg_mark = _svg_time
+
+    @contextmanager
+    def record(self, scene, animations):
+        raster_time, encode_time, frames = self.raster.time, self.encode.time, self.encode.calls
+        mobjects = len(scene.mobjects)
+        family_size = sum(len(mob.get_family()) for mob in scene.mobjects)
+        start = time.perf_counter()
+        yield
+        play_time = time.perf_counter() - start
+        frames = self.encode.calls - frames
+        if self.holds is not None:
+            frames += self.holds.last_hold
+        self.records.append({
+            'play': len(self.records),
+            'section': getattr(scene, 'section', None),
+            'slide': getattr(scene, 'slide_index', None),
+            'animations': ' '.join(animation_name(a) for a in animations),
+            'mobjects': mobjects,
+            'family_size': family_size,
+            'frames': frames,
+            'svg_time': _svg_time - self.svg_mark,
+            'raster_time': self.raster.time - raster_time,
+            'encode_time': self.encode.time - encode_time,
+            'play_time': play_time,
+        })
+        self.svg_mark = _svg_time
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', newline='') as f:
+            if self.path.suffix == '.csv':
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(self.records)
+            else:
+                json.dump(self.records, f, indent=2)
+        return self.path
@@ -0,0 +1,210 @@
+"""Incremental renders: only the slides whose content changed are rendered.
+
+Enabled with INCREMENTAL=1 (see tutorial.py). Every slide gets a hash of what
+it is made of:
+
+- the source of the deck module without its section methods (the mobject
+  classes, the helpers, the constants like STEP and the scalings), the source
+  of the modules of this directory it imports (brute.py, tex_matrix.py, ...),
+  the versions of Manim and manim-slides, the formula and matrix compiled
+  from the recurrence spec, and the render settings
+  (resolution, frame rate, movie format and transparency, and the render
+  modes changing the movies: PROXIES, STATIC_FRAMES, COLLAPSE_COPIES)
+- the name of its section, and the source of the section method from the
+  previous pause() to the pause() ending the slide
+- the hash of the slide before it, in deck order across the sections: what
+  comes before a slide, in its section or in an earlier one, sets up what it
+  shows. The first slide of a section chains to the whole source of the
+  section before, so a section scene and the full deck agree on the keys.
+
+So editing a text of a slide invalidates it and all the slides after it, and
+nothing before it. The partial movies of every rendered slide are kept
+in CACHE_DIR under its hash. When rendering, the plays of a slide found there
+are skipped (the mobjects still move to where the animations end, but no frame
+is rendered) and its cached partial movies take their place.
+
+A slide is stored as soon as its pause() is reached, so a render that crashes
+or is killed keeps every slide it finished, and the next render starts over
+from the first slide it did not.
+
+Manim's own per play hashing, which serializes the whole scene for every play,
+is not needed then and gets disabled.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from importlib import metadata
+from pathlib import Path
+
+from manim import __version__ as manim_version
+from manim import config
+
+HERE = Path(__file__).resolve().parent
+CACHE_DIR = HERE / 'media' / 'slide_cache'
+
+
+def sha(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()[:32]
+
+
+def library_versions():
+    versions = [manim_version]
+    try:
+        versions.append(metadata.version('manim-slides'))
+    except metadata.PackageNotFoundError:
+        versions.append(None)
+    return versions
+
+
+def local_sources(deck):
+    # every module of this directory the deck imported (brute, tex_matrix, ...)
+    sources = []
+    for name, module in sorted(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if module is deck or path is None or Path(path).resolve().parent != HERE:
+            continue
+        sources += [name, Path(path).read_text(encoding='utf-8')]
+    return sources
+
+
+def common_hash(scene, sections, extra=()):
+    module = inspect.getmodule(type(scene))
+    source = inspect.getsource(module)
+    for section in sections:
+        source = source.replace(inspect.getsource(getattr(type(scene), section)), '')
+    source = [source, *local_sources(module), *library_versions()]
+    # everything deciding how the partial movies are encoded, builds share the cache
+    settings = (
+        config.pixel_width, config.pixel_height, config.frame_rate, config.background_color,
+        config.format, config.movie_file_extension, config.transparent,
+    )
+    return sha(*source, *extra, *settings)
+
+
+def section_chunks(scene, section):
+    # the source of the section cut after every pause(), and what is after the last one
+    lines = inspect.getsource(getattr(type(scene), section)).splitlines()
+    chunks = []
+    start = 0
+    for i, line in enumerate(lines):
+        if line.strip() == 'self.pause()':
+            chunks.append('\n'.join(lines[start:i + 1]))
+            start = i + 1
+    chunks.append('\n'.join(lines[start:]))
+    return chunks
+
+
+def section_hashes(scene, sections, common):
+    # one hash per slide, each one made with the hash of the slide before it
+    hashes = {}
+    previous = common
+    for section in sections:
+        hashes[section] = []
+        for chunk in section_chunks(scene, section):
+            previous = sha(previous, section, chunk)
+            hashes[section].append(previous)
+    return hashes
+
+
+class SlideCache:
+    def __init__(self, scene, sections, extra=(), report=None):
+        self.scene = scene
+        # where finish() writes which slides were rendered and which reused
+        self.report = report
+        common = common_hash(scene, sections, extra)
+        self.hashes = section_hashes(scene, sections, common)
+        # slide hash of every play, by play number
+        self.plays = {}
+        self.closed = set()
+
+    def key(self, section, index):
+        hashes = self.hashes[section]
+        if index < len(hashes) - 1:
+            return hashes[index]
+        # after the last pause(), or a pause() in a loop: chained to all the
+        # source of the section, still one key per slide
+        return sha(hashes[-1], index)
+
+    def files_path(self, key):
+        return CACHE_DIR / key / 'files.json'
+
+    def cached_files(self, key):
+        path = self.files_path(key)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            names = json.load(f)
+        # slides stored as 0000.mp4, ... by older versions: manim-slides would mix them up
+        if not all(name.startswith(f'{key}_') for name in names):
+            return None
+        return [CACHE_DIR / key / name for name in names]
+
+    def has(self, key):
+        return self.cached_files(key) is not None
+
+    def add_play(self, key):
+        self.plays[self.scene.renderer.num_plays] = key
+
+    def close(self, key):
+        self.closed.add(key)
+        partial_movie_files = self.scene.renderer.file_writer.partial_movie_files
+        plays = [play for play, play_key in sorted(self.plays.items()) if play_key == key]
+        if not self.has(key) and all(partial_movie_files[play] is not None for play in plays):
+            self.store(key, [partial_movie_files[play] for play in plays])
+
+    def store(self, key, files):
+        # built aside and renamed into place, several renders may store the same slide
+        tmp = CACHE_DIR / f'{key}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        names = []
+        for i, file in enumerate(files):
+            # manim-slides and multi_output find the movies by file name, unique across slides
+            name = f'{key}_{i:04}{Path(file).suffix}'
+            shutil.copyfile(file, tmp / name)
+            names.append(name)
+        with open(tmp / 'files.json', 'w') as f:
+            json.dump(names, f)
+        directory = CACHE_DIR / key
+        if directory.exists() and not self.has(key):
+            # left half written by an older version
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # another render stored it first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def finish(self):
+        """Store the new slides and put the cached movies in place of the skipped plays."""
+        partial_movie_files = self.scene.renderer.file_writer.partial_movie_files
+        by_slide = {}
+        for play, key in sorted(self.plays.items()):
+            by_slide.setdefault(key, []).append(play)
+        for key in self.closed:
+            by_slide.setdefault(key, [])
+
+        report = []
+        for key, plays in by_slide.items():
+            rendered = all(partial_movie_files[play] is not None for play in plays)
+            report.append({'slide': key, 'plays': len(plays), 'status': 'rendered' if rendered else 'cached'})
+            cached = self.cached_files(key)
+            if cached is not None:
+                if len(cached) != len(plays):
+                    raise RuntimeError(f'slide {key} has {len(plays)} plays, but {len(cached)} are cached')
+                for play, file in zip(plays, cached):
+                    if partial_movie_files[play] is None:
+                        partial_movie_files[play] = str(file)
+            elif key in self.closed and rendered:
+                self.store(key, [partial_movie_files[play] for play in plays])
+
+        if self.report is not None:
+            with open(self.report, 'w') as f:
+                json.dump(report, f, indent=2)
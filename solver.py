@@ -0,0 +1,371 @@
+"""Reference solver for the Hallway Tiling problem.
+
+It uses the same transition matrix as the one shown in the deck (MATRIX_TEXT,
+both are compiled from the recurrence spec of recurrence.py):
+
+    (cnt_n, cnt_{n-1}, cnt_{n-2}, sum_n, sum_{n-1}, sum_{n-2}) = M^n (1, 0, 0, 0, 0, 0)
+
+and the answer (the expected coverage) is sum_n / cnt_n. Everything is computed
+modulo `mod`, or exactly with Python integers when mod=None.
+"""
+import argparse
+import random
+import sys
+import time
+from fractions import Fraction
+
+from recurrence import SPEC, compile_spec
+
+try:
+    import numpy as np
+except ImportError:  # only needed for the vectorized path
+    np = None
+
+MOD = 10**9 + 7
+
+# Compiled from the same spec as the deck (see recurrence.py). MATRIX_TEXT is the
+# matrix with its row and column labels, exactly as typeset.
+COMPILED = compile_spec(SPEC)
+MATRIX_TEXT = COMPILED.matrix_text
+TRANSITION = COMPILED.transition
+BASE = COMPILED.base
+SIZE = COMPILED.size
+IDENTITY = tuple(tuple(int(i == j) for j in range(SIZE)) for i in range(SIZE))
+CNT, SUM = COMPILED.cnt, COMPILED.sum
+
+
+def mat_mul(a, b, mod=None):
+    bt = tuple(zip(*b))
+    if mod is None:
+        return tuple(tuple(sum(x * y for x, y in zip(row, col)) for col in bt) for row in a)
+    return tuple(tuple(sum(x * y for x, y in zip(row, col)) % mod for col in bt) for row in a)
+
+
+def mat_vec(a, v, mod=None):
+    if mod is None:
+        return tuple(sum(x * y for x, y in zip(row, v)) for row in a)
+    return tuple(sum(x * y for x, y in zip(row, v)) % mod for row in a)
+
+
+def check_n(n):
+    if n < 0:
+        raise ValueError(f'n must be non negative, got {n}')
+
+
+def solve(n, mod=MOD):
+    """Return (cnt_n, sum_n).
+
+    The powers of M come from the engine shared by all the calls with this
+    modulus, so after the first call a query is only matrix-vector products.
+    """
+    return engine(mod).solve(n)
+
+
+def solve_by_squaring(n, mod=MOD):
+    """solve() from scratch, squaring M again for every query."""
+    check_n(n)
+    # M^n v, one bit of n at a time. All the powers of M commute, so the
+    # vector can take the squares in any order.
+    power = TRANSITION
+    v = BASE
+    while n > 0:
+        if n & 1:
+            v = mat_vec(power, v, mod)
+        n >>= 1
+        if n > 0:
+            power = mat_mul(power, power, mod)
+    return v[CNT], v[SUM]
+
+
+def count(n, mod=MOD):
+    return solve(n, mod)[0]
+
+
+def total_coverage(n, mod=MOD):
+    return solve(n, mod)[1]
+
+
+def expected(cnt, total, mod=MOD):
+    if mod is None:
+        return Fraction(total, cnt)
+    return total * pow(cnt, -1, mod) % mod
+
+
+def batch_inverse(values, mod=MOD, zeros=False):
+    """Inverses of all the values modulo a prime, with a single pow().
+
+    A multiple of mod raises ValueError, or with zeros=True gets None as its
+    inverse while the others are still computed.
+    """
+    prefix = [1] * (len(values) + 1)
+    for i, x in enumerate(values):
+        if x % mod == 0:
+            if not zeros:
+                raise ValueError(f'{x} has no inverse modulo {mod}')
+            # left out of the product
+            x = 1
+        prefix[i + 1] = prefix[i] * x % mod
+    inverses = [0] * len(values)
+    inv = pow(prefix[-1], mod - 2, mod)
+    for i in range(len(values) - 1, -1, -1):
+        if values[i] % mod == 0:
+            inverses[i] = None
+            continue
+        inverses[i] = inv * prefix[i] % mod
+        inv = inv * values[i] % mod
+    return inverses
+
+
+def expected_coverage(n, mod=MOD):
+    """sum_n / cnt_n, as a Fraction when mod=None."""
+    return expected(*solve(n, mod), mod)
+
+
+class Engine:
+    """Answers many queries with the same modulus.
+
+    M^(2^k) is computed once for every bit k, so a query only needs a
+    matrix-vector product per set bit of n: O(6^2 log n) instead of O(6^3 log n).
+    The powers for n < 2^61 (n up to 10^18) are precomputed, except in exact
+    mode where the entries grow too fast and they are only added when needed.
+    """
+    def __init__(self, mod=MOD, bits=61):
+        self.mod = mod
+        self.powers = [TRANSITION if mod is None else mat_mul(TRANSITION, IDENTITY, mod)]
+        if mod is not None:
+            self.extend(bits)
+
+    @property
+    def vectorizable(self):
+        # solve_array works in int64, the 6 products of a row must fit in it
+        return np is not None and self.mod is not None and SIZE * (self.mod - 1) ** 2 < 2**63
+
+    def extend(self, bits):
+        while len(self.powers) < bits:
+            self.powers.append(mat_mul(self.powers[-1], self.powers[-1], self.mod))
+
+    def solve(self, n):
+        check_n(n)
+        self.extend(n.bit_length())
+        mod = self.mod
+        v = BASE
+        k = 0
+        while n > 0:
+            if n & 1:
+                v = mat_vec(self.powers[k], v, mod)
+            n >>= 1
+            k += 1
+        return v[CNT], v[SUM]
+
+    def solve_many(self, ns):
+        return [self.solve(int(n)) for n in ns]
+
+    def expected_coverage(self, n):
+        return expected(*self.solve(n), self.mod)
+
+    def expected_coverage_many(self, ns):
+        return [expected(cnt, total, self.mod) for cnt, total in self.solve_many(ns)]
+
+    def solve_array(self, ns):
+        """Vectorized solve() over a NumPy array of n, returns (cnt, sum) arrays.
+
+        All the queries go through the bits of their n together, each step is a
+        6x6 by 6xN int64 product. The 6 products of a row must fit in an int64,
+        so the modulus is limited to about 1.2 * 10^9.
+        """
+        mod = self.mod
+        if np is None:
+            raise RuntimeError('the vectorized path needs numpy')
+        if not self.vectorizable:
+            raise ValueError(f'the vectorized path needs a modulus below ~1.2 * 10^9, got {mod}')
+        ns = np.asarray(ns, dtype=np.int64)
+        if ns.size > 0 and ns.min() < 0:
+            raise ValueError('n must be non negative')
+
+        v = np.zeros((SIZE, ns.size), dtype=np.int64)
+        v[:, :] = np.array(BASE, dtype=np.int64)[:, None]
+        bits = int(ns.max()).bit_length() if ns.size > 0 else 0
+        self.extend(bits)
+        for k in range(bits):
+            mask = ((ns >> k) & 1).astype(bool)
+            if mask.any():
+                power = np.array(self.powers[k], dtype=np.int64)
+                v[:, mask] = (power @ v[:, mask]) % mod
+        return v[CNT], v[SUM]
+
+    def expected_coverage_array(self, ns):
+        cnt, total = self.solve_array(ns)
+        return total * pow_array(cnt, self.mod - 2, self.mod) % self.mod
+
+    def benchmark(self, ns, vectorized=False):
+        """Queries per second of solve_many (or solve_array) over ns."""
+        start = time.perf_counter()
+        if vectorized:
+            self.solve_array(ns)
+        else:
+            self.solve_many(ns)
+        return len(ns) / (time.perf_counter() - start)
+
+
+def pow_array(a, e, mod):
+    # a^e element-wise, a is an int64 array of residues. mod must be prime for
+    # a^(mod - 2) to be the inverse.
+    result = np.ones_like(a)
+    a = a % mod
+    while e > 0:
+        if e & 1:
+            result = result * a % mod
+        a = a * a % mod
+        e >>= 1
+    return result
+
+
+def berlekamp_massey(seq, mod):
+    """Shortest c with seq[i] = sum(c[j] * seq[i - 1 - j]), modulo a prime."""
+    size = len(seq)
+    c = [1] + [0] * size
+    b = [1] + [0] * size
+    length, shift, last = 0, 0, 1
+    for i in range(size):
+        shift += 1
+        discrepancy = seq[i] % mod
+        for j in range(1, length + 1):
+            discrepancy = (discrepancy + c[j] * seq[i - j]) % mod
+        if discrepancy == 0:
+            continue
+        old = c[:]
+        coef = discrepancy * pow(last, mod - 2, mod) % mod
+        for j in range(shift, size + 1):
+            c[j] = (c[j] - coef * b[j - shift]) % mod
+        if 2 * length > i:
+            continue
+        length, b, last, shift = i + 1 - length, old, discrepancy, 0
+    return [(-x) % mod for x in c[1:length + 1]]
+
+
+class Recurrence:
+    """Solver on the minimal linear recurrence of the sequence instead of M^n.
+
+    The recurrence of the state vectors v_n = M^n (1, 0, 0, 0, 0, 0) is found
+    with Berlekamp-Massey on the first terms. With d its order, x^n modulo the
+    characteristic polynomial gives v_n as a combination of v_0 .. v_{d-1}
+    (Kitamasa), so a step costs O(d^2) instead of a 6x6 matrix product. The
+    modulus must be prime.
+    """
+    def __init__(self, mod=MOD, seed=0):
+        if mod is None:
+            raise ValueError('the recurrence solver needs a prime modulus')
+        self.mod = mod
+        terms = [BASE]
+        for i in range(4 * SIZE):
+            terms.append(mat_vec(TRANSITION, terms[-1], mod))
+        # The minimal polynomial of the vectors is the one of a random
+        # projection of them, unless we are very unlucky. Check it on every
+        # coordinate anyway.
+        rng = random.Random(seed)
+        while True:
+            weights = [rng.randrange(mod) for _ in range(SIZE)]
+            seq = [sum(w * x for w, x in zip(weights, v)) % mod for v in terms[:2 * SIZE]]
+            self.coefs = berlekamp_massey(seq, mod)
+            if self.generates(terms):
+                break
+        self.order = len(self.coefs)
+        self.initial = terms[:self.order]
+
+    def generates(self, terms):
+        mod = self.mod
+        for i in range(len(self.coefs), len(terms)):
+            for k in range(SIZE):
+                if sum(c * terms[i - 1 - j][k] for j, c in enumerate(self.coefs)) % mod != terms[i][k]:
+                    return False
+        return True
+
+    def x_power(self, n):
+        # x^n modulo x^d - c_0 x^(d - 1) - ... - c_(d - 1), as the d coefficients from x^0 up
+        mod, d = self.mod, self.order
+        # x^d = sum(low[i] * x^i)
+        low = self.coefs[::-1]
+        result = [1] + [0] * (d - 1)
+        for bit in bin(n)[2:]:
+            square = [0] * (2 * d - 1)
+            for i, x in enumerate(result):
+                if x:
+                    for j, y in enumerate(result):
+                        square[i + j] += x * y
+            for k in range(2 * d - 2, d - 1, -1):
+                top = square[k] % mod
+                if top:
+                    for i, y in enumerate(low):
+                        square[k - d + i] += top * y
+            result = [x % mod for x in square[:d]]
+            if bit == '1':
+                top = result[-1]
+                result = [(top * low[0]) % mod] + [(x + top * y) % mod for x, y in zip(result, low[1:])]
+        return result
+
+    def solve(self, n):
+        check_n(n)
+        if self.order == 0:
+            return 0, 0
+        r = self.x_power(n)
+        mod = self.mod
+        cnt = sum(x * v[CNT] for x, v in zip(r, self.initial)) % mod
+        total = sum(x * v[SUM] for x, v in zip(r, self.initial)) % mod
+        return cnt, total
+
+    def solve_many(self, ns):
+        return [self.solve(int(n)) for n in ns]
+
+    def expected_coverage(self, n):
+        return expected(*self.solve(n), self.mod)
+
+    def expected_coverage_many(self, ns):
+        return [expected(cnt, total, self.mod) for cnt, total in self.solve_many(ns)]
+
+    def benchmark(self, ns):
+        start = time.perf_counter()
+        self.solve_many(ns)
+        return len(ns) / (time.perf_counter() - start)
+
+
+_engines = {}
+
+
+def engine(mod=MOD):
+    """The Engine of the module level functions, one per modulus."""
+    if mod not in _engines:
+        _engines[mod] = Engine(mod)
+    return _engines[mod]
+
+
+def random_queries(count, max_n=10**18, seed=0):
+    rng = random.Random(seed)
+    return [rng.randint(0, max_n) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the solvers on random n.')
+    parser.add_argument('count', type=int, nargs='?', default=100000, help='number of queries')
+    parser.add_argument('--max-n', type=int, default=10**18)
+    parser.add_argument('--mod', type=int, default=MOD)
+    args = parser.parse_args()
+
+    ns = random_queries(args.count, args.max_n)
+    engine = Engine(args.mod)
+    recurrence = Recurrence(args.mod)
+    single = ns[:min(len(ns), 1000)]
+    if recurrence.solve_many(single) != [solve_by_squaring(n, args.mod) for n in single]:
+        sys.exit('the recurrence and matrix solvers disagree')
+
+    start = time.perf_counter()
+    for n in single:
+        solve_by_squaring(n, args.mod)
+    print(f'matrix power: {len(single) / (time.perf_counter() - start):.0f} queries/s')
+    print(f'engine: {engine.benchmark(ns):.0f} queries/s')
+    if np is not None:
+        print(f'numpy: {engine.benchmark(np.array(ns, dtype=np.int64), vectorized=True):.0f} queries/s')
+    print(f'recurrence (order {recurrence.order}): {recurrence.benchmark(ns):.0f} queries/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Correctness and speed of every solver mode of solver.py.
+
+    python solver_bench.py [--batches 1000,...,10000000] [--budget 20] [--save-baseline]
+
+The modes: pure Python matrix power squaring M for every query
+(solve_by_squaring), the engine sharing the powers of the matrix between
+queries (Engine.solve_many, and solve() one query at a time), its NumPy
+version (Engine.solve_array) and the linear recurrence (Recurrence.solve_many).
+
+1. Every mode against the profile DP of brute.py, for every n <= --oracle-n.
+2. Every mode against the others, for random n up to --max-n (10^18).
+3. Latency percentiles of single queries.
+4. Throughput for every batch size. A mode skips the batches it would need
+   more than --budget seconds for, estimated from its previous batch.
+
+It fails on any disagreement. With --save-baseline the throughputs are written
+to solver_baseline.json, otherwise they are compared to it and the script
+fails if a mode got slower than the baseline by more than --max-slowdown, or
+skips a batch it ran in the baseline.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import brute
+import solver
+from solver import MOD, Engine, Recurrence, np, random_queries
+
+HERE = Path(__file__).resolve().parent
+BASELINE = HERE / 'solver_baseline.json'
+BATCHES = [10**3, 10**4, 10**5, 10**6, 10**7]
+PERCENTILES = [50, 90, 99]
+# queries solved at once by the numpy mode
+QUERY_CHUNK = 1 << 20
+
+
+def make_modes(mod):
+    engine = Engine(mod)
+    recurrence = Recurrence(mod)
+    modes = {
+        'matrix': lambda ns: [solver.solve_by_squaring(int(n), mod) for n in ns],
+        'solve': lambda ns: [solver.solve(int(n), mod) for n in ns],
+        'engine': engine.solve_many,
+        'recurrence': recurrence.solve_many,
+    }
+    if engine.vectorizable:
+        def numpy_mode(ns):
+            results = []
+            ns = np.asarray(ns, dtype=np.int64)
+            # bounded memory, like judge.py
+            for start in range(0, ns.size, QUERY_CHUNK):
+                cnt, total = engine.solve_array(ns[start:start + QUERY_CHUNK])
+                results.extend(zip(cnt.tolist(), total.tolist()))
+            return results
+        modes['numpy'] = numpy_mode
+    return modes
+
+
+def check_oracle(modes, mod, max_n):
+    ns = list(range(max_n + 1))
+    expected = [tuple(x % mod for x in brute.count(n)) for n in ns]
+    failures = []
+    for name, run in modes.items():
+        for n, got, want in zip(ns, run(ns), expected):
+            if tuple(got) != want:
+                failures.append(f'{name}: n = {n}, got {tuple(got)}, brute force {want}')
+                break
+    return failures
+
+
+def check_agreement(modes, ns):
+    answers = {name: [tuple(x) for x in run(ns)] for name, run in modes.items()}
+    reference, expected = next(iter(answers.items()))
+    failures = []
+    for name, got in answers.items():
+        for n, a, b in zip(ns, got, expected):
+            if a != b:
+                failures.append(f'{name} and {reference} disagree for n = {n}: {a} != {b}')
+                break
+    return failures
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * p // 100)]
+
+
+def latencies(run, ns):
+    times = []
+    for n in ns:
+        start = time.perf_counter()
+        run([n])
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {f'p{p}': percentile(times, p) for p in PERCENTILES}
+
+
+def throughputs(run, batches, max_n, budget):
+    results = {}
+    rate = None
+    for size in batches:
+        if rate is not None and size / rate > budget:
+            break
+        ns = random_queries(size, max_n, seed=size)
+        start = time.perf_counter()
+        run(ns)
+        rate = size / (time.perf_counter() - start)
+        results[str(size)] = rate
+    return results
+
+
+def regressions(results, baseline, max_slowdown, batches):
+    found = []
+    for name, rates in results.items():
+        for size, base in baseline.get(name, {}).items():
+            if int(size) not in batches:
+                continue
+            rate = rates.get(size)
+            if rate is None:
+                # too slow to run within the budget any more
+                found.append(f'{name}, batch {size}: {base:.0f} queries/s -> skipped')
+            elif rate < base * (1 - max_slowdown):
+                found.append(f'{name}, batch {size}: {base:.0f} -> {rate:.0f} queries/s')
+    return found
+
+
+def split_ints(value):
+    return [int(float(x)) for x in value.split(',') if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mod', type=int, default=MOD)
+    parser.add_argument('--oracle-n', type=int, default=60, help='check against the brute force up to this n')
+    parser.add_argument('--random', type=int, default=2000, help='number of random n the modes are compared on')
+    parser.add_argument('--max-n', type=int, default=10**18)
+    parser.add_argument('--latency-queries', type=int, default=300)
+    parser.add_argument('--batches', type=split_ints, default=BATCHES)
+    parser.add_argument('--budget', type=float, default=20, help='seconds a mode may spend on one batch')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write the throughputs to {BASELINE.name}')
+    parser.add_argument('--max-slowdown', type=float, default=0.3, help='allowed throughput drop (default: 0.3, 30%%)')
+    args = parser.parse_args()
+
+    modes = make_modes(args.mod)
+    failures = check_oracle(modes, args.mod, args.oracle_n)
+    failures += check_agreement(modes, random_queries(args.random, args.max_n, seed=1))
+    if failures:
+        sys.exit('\n'.join(failures))
+    print(f'{", ".join(modes)}: agree with the brute force for n <= {args.oracle_n} and with each other on {args.random} random n')
+
+    ns = random_queries(args.latency_queries, args.max_n, seed=2)
+    print('\nlatency of one query (us)')
+    print(f'{"mode":12}' + ''.join(f'{f"p{p}":>10}' for p in PERCENTILES))
+    for name, run in modes.items():
+        lat = latencies(run, ns)
+        print(f'{name:12}' + ''.join(f'{lat[f"p{p}"] * 1e6:10.1f}' for p in PERCENTILES))
+
+    print('\nthroughput (queries/s)')
+    print(f'{"mode":12}' + ''.join(f'{size:>12}' for size in args.batches))
+    results = {}
+    for name, run in modes.items():
+        results[name] = throughputs(run, args.batches, args.max_n, args.budget)
+        print(f'{name:12}' + ''.join(f'{results[name].get(str(size), float("nan")):12.0f}' for size in args.batches))
+
+    if args.save_baseline:
+        with open(BASELINE, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nBaseline: {BASELINE}')
+        return
+    if not BASELINE.exists():
+        return
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    found = regressions(results, baseline, args.max_slowdown, args.batches)
+    if found:
+        sys.exit('throughput regressions against the baseline:\n' + '\n'.join(found))
+    print('\nno regression against the baseline')
+
+
+if __name__ == '__main__':
+    main()
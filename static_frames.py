@@ -0,0 +1,111 @@
+"""Don't rasterize or pipe frames which are the same as the previous one.
+
+Two cases, both on the cairo renderer:
+
+- Static holds (a wait with nothing moving). Manim already draws a single
+  frame for them, but still pipes it to ffmpeg once per frame. Here it is
+  piped once, and when the partial movie is closed ffmpeg clones that frame
+  for the rest of the hold. Only for plain mp4 movies: other formats (webm,
+  gif, transparent movies) are left to Manim.
+- Frames of an animation where none of the moving mobjects changed since the
+  previous frame (the end of an animation that stopped moving, for example).
+  The previous frame is still in the camera, so it is just not redrawn.
+  Frames are compared by a hash of what is drawn, not by a copy of it.
+"""
+import hashlib
+import os
+import subprocess
+
+import numpy as np
+from manim import config
+
+STYLE = ('fill_rgbas', 'stroke_rgbas', 'background_stroke_rgbas')
+
+
+def mobjects_state(mobjects):
+    h = hashlib.blake2b(digest_size=16)
+    for mob in mobjects:
+        for sub in mob.get_family():
+            h.update(repr((id(sub), sub.z_index, getattr(sub, 'stroke_width', None))).encode())
+            # straight from the arrays, without copying them
+            h.update(np.ascontiguousarray(sub.points))
+            for attr in STYLE:
+                if hasattr(sub, attr):
+                    h.update(np.ascontiguousarray(getattr(sub, attr)))
+    return h.digest()
+
+
+def can_hold():
+    # extend_movie re-encodes like Manim does for mp4, the other formats have their own settings
+    return config.format in (None, 'mp4') and not config.transparent and config.movie_file_extension == '.mp4'
+
+
+def extend_movie(path, extra_frames):
+    tmp = f'{path}.hold.mp4'
+    subprocess.run([
+        config.ffmpeg_executable, '-y', '-loglevel', 'error', '-i', path,
+        '-vf', f'tpad=stop_mode=clone:stop={extra_frames}',
+        '-r', str(config.frame_rate), '-an', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p',
+        tmp,
+    ], check=True)
+    os.replace(tmp, path)
+
+
+class StaticFrames:
+    def __init__(self, scene):
+        self.renderer = renderer = scene.renderer
+        self.last_state = None
+        self.pending_hold = 0
+        # extra frames added to the last partial movie closed
+        self.last_hold = 0
+        self.frames_skipped = 0
+        self.holds = can_hold()
+
+        update_frame = renderer.update_frame
+        freeze_current_frame = renderer.freeze_current_frame
+        end_animation = renderer.file_writer.end_animation
+        begin_animation = renderer.file_writer.begin_animation
+
+        def unchanged_update_frame(scene, mobjects=None, *args, **kwargs):
+            drawn = mobjects if mobjects else scene.mobjects
+            state = (id(renderer.static_image), args, sorted(kwargs.items()), mobjects_state(drawn))
+            if state == self.last_state:
+                self.frames_skipped += 1
+                return
+            update_frame(scene, mobjects, *args, **kwargs)
+            self.last_state = state
+
+        def held_freeze_current_frame(duration):
+            dt = 1 / renderer.camera.frame_rate
+            num_frames = int(duration / dt)
+            if renderer.skip_animations or num_frames < 2 or not self.holds:
+                return freeze_current_frame(duration)
+            renderer.add_frame(renderer.get_frame())
+            renderer.time += (num_frames - 1) * dt
+            self.pending_hold += num_frames - 1
+            self.frames_skipped += num_frames - 1
+
+        def begin(*args, **kwargs):
+            # new play, new static image
+            self.last_state = None
+            return begin_animation(*args, **kwargs)
+
+        def end(allow_write=False):
+            end_animation(allow_write)
+            self.last_hold = 0
+            if self.pending_hold > 0 and allow_write:
+                extend_movie(renderer.file_writer.partial_movie_files[renderer.num_plays], self.pending_hold)
+                self.last_hold = self.pending_hold
+            self.pending_hold = 0
+
+        renderer.update_frame = unchanged_update_frame
+        renderer.freeze_current_frame = held_freeze_current_frame
+        renderer.file_writer.begin_animation = begin
+        renderer.file_writer.end_animation = end
+
+
+def install(scene):
+    # the OpenGL renderer draws in a different way, leave it alone
+    if not hasattr(scene.renderer, 'freeze_current_frame'):
+        return None
+    return StaticFrames(scene)
@@ -0,0 +1,40 @@
+"""One PNG per slide, for reviewing the deck without rendering it.
+
+Enabled with STILLS=<dir> (see tutorial.py). Every play is skipped, so the
+mobjects jump to the end of the animations and nothing is rasterized, except
+at every pause() where the frame the slide ends on is drawn once and saved as
+<dir>/<Scene>/<slide>.png. <dir>/<Scene>/manifest.json lists them.
+"""
+import json
+from pathlib import Path
+
+
+class Stills:
+    def __init__(self, scene, directory):
+        self.scene = scene
+        self.directory = Path(directory) / type(scene).__name__
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest = []
+
+        renderer = scene.renderer
+        self.update_frame = renderer.update_frame
+
+        def update_frame_if_not_skipped(*args, **kwargs):
+            if not renderer.skip_animations:
+                self.update_frame(*args, **kwargs)
+
+        renderer.update_frame = update_frame_if_not_skipped
+
+    def capture(self, slide, section=None):
+        renderer = self.scene.renderer
+        # the static image of the last play was never drawn, start from a blank frame
+        renderer.static_image = None
+        self.update_frame(self.scene)
+        path = self.directory / f'{slide:03}.png'
+        renderer.camera.get_image().save(path)
+        self.manifest.append({'slide': slide, 'section': section, 'file': path.name})
+        return path
+
+    def save(self):
+        with open(self.directory / 'manifest.json', 'w') as f:
+            json.dump(self.manifest, f, indent=2)
@@ -0,0 +1,209 @@
+"""Content addressed cache for the TeX of the deck, filled by one LaTeX job.
+
+Manim compiles every Tex/MathTex (and every part of them, and every Matrix
+entry) with its own latex + dvisvgm run. Here each TeX document is keyed by a
+hash of its full code (so the string *and* the preamble), and the SVG is stored
+in CACHE_DIR under that key.
+
+Every document the deck asks for is recorded in MANIFEST. The pre-pass
+(`prepare()`) compiles all recorded documents that are not cached yet as pages
+of a single multi-page LaTeX file, then splits the result into one SVG per
+page.
+
+The manifest is made by a scan of the deck (`scan()`): the whole deck is built
+once with TEX_SCAN=1, nothing rendered and no TeX compiled (a placeholder SVG
+stands for every document not cached yet), and the documents it asked for
+replace the manifest, so the ones the deck dropped go away. `collect()` scans
+again when a source of the deck is newer than the manifest. With both, a cold
+build only runs the compiler once: `python tex_cache.py` does only that.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+CACHE_DIR = HERE / 'media' / 'tex_cache'
+MANIFEST = HERE / 'tex_manifest.jsonl'
+SCAN_MANIFEST = HERE / 'tex_manifest.scan.jsonl'
+# what the manifest is made from
+DECK_SOURCES = ['tutorial.py', 'recurrence.py', 'tex_matrix.py']
+
+# stands for the documents not compiled yet during a scan
+PLACEHOLDER_SVG = '<svg xmlns="http://www.w3.org/2000/svg" width="1" height="1" viewBox="0 0 1 1"><path d="M0 0h1v1h-1z"/></svg>'
+
+BEGIN_DOCUMENT = r'\begin{document}'
+END_DOCUMENT = r'\end{document}'
+
+_recorded = None
+_scanning = False
+
+
+def scanning():
+    return _scanning
+
+
+def tex_key(code, compiler='latex', output_format='.dvi'):
+    return hashlib.sha256(f'{compiler}\n{output_format}\n{code}'.encode()).hexdigest()[:32]
+
+
+def cached_svg(key):
+    path = CACHE_DIR / f'{key}.svg'
+    return path if path.exists() else None
+
+
+def read_manifest():
+    entries = {}
+    if MANIFEST.exists():
+        with open(MANIFEST, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry['key']] = entry
+    return entries
+
+
+def record(code, compiler, output_format):
+    global _recorded
+    manifest = SCAN_MANIFEST if _scanning else MANIFEST
+    if _recorded is None:
+        _recorded = set() if _scanning else set(read_manifest())
+    key = tex_key(code, compiler, output_format)
+    if key not in _recorded:
+        _recorded.add(key)
+        # one line per document, so several render processes can append at once
+        with open(manifest, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'key': key, 'compiler': compiler, 'output_format': output_format, 'code': code}, ensure_ascii=False) + '\n')
+    return key
+
+
+def split_document(code):
+    begin = code.index(BEGIN_DOCUMENT) + len(BEGIN_DOCUMENT)
+    end = code.rindex(END_DOCUMENT)
+    return code[:begin], code[begin:end]
+
+
+def make_multipage_head(head):
+    # the standalone class puts every `standalone` environment on its own page in multi mode
+    head, cnt = re.subn(r'\\documentclass\[([^\]]*)\]\{standalone\}', r'\\documentclass[\1,multi=true]{standalone}', head, count=1)
+    return head if cnt == 1 else None
+
+
+def compile_batch(entries, compiler, output_format):
+    head = make_multipage_head(split_document(entries[0]['code'])[0])
+    if head is None or output_format not in ('.dvi', '.xdv'):
+        return 0
+    pages = [split_document(entry['code'])[1] for entry in entries]
+    code = head + ''.join('\\begin{standalone}%s\\end{standalone}\n' % page for page in pages) + END_DOCUMENT + '\n'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'batch.tex').write_text(code, encoding='utf-8')
+        cmd = [compiler, '-interaction=batchmode', '-halt-on-error', f'-output-directory={tmp}', 'batch.tex']
+        if compiler == 'xelatex':
+            cmd.insert(1, '-no-pdf')
+        if subprocess.run(cmd, cwd=tmp, stdout=subprocess.DEVNULL).returncode != 0:
+            # leave them to manim, it compiles them one by one and reports the error properly
+            return 0
+        result = subprocess.run(
+            ['dvisvgm', '--page=1-', '-n', '-v', '0', '-o', str(tmp / 'page-%p.svg'), str(tmp / f'batch{output_format}')],
+            stdout=subprocess.DEVNULL,
+        )
+        if result.returncode != 0:
+            # same as a LaTeX failure, manim converts them one by one
+            return 0
+        svgs = sorted(tmp.glob('page-*.svg'), key=lambda path: int(path.stem.rsplit('-', 1)[1]))
+        if len(svgs) != len(entries):
+            return 0
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for entry, svg in zip(entries, svgs):
+            shutil.move(str(svg), CACHE_DIR / f"{entry['key']}.svg")
+    return len(entries)
+
+
+def prepare():
+    if _scanning:
+        return 0
+    groups = {}
+    for entry in read_manifest().values():
+        if cached_svg(entry['key']) is None:
+            head = split_document(entry['code'])[0]
+            groups.setdefault((head, entry['compiler'], entry['output_format']), []).append(entry)
+    return sum(compile_batch(entries, compiler, output_format) for (_, compiler, output_format), entries in groups.items())
+
+
+def scan(module='tutorial', scene='HallwayTilingTutorial'):
+    """Replace the manifest with the documents the deck asks for now.
+
+    Returns their number, or None if the scan failed (the manifest is kept then).
+    """
+    SCAN_MANIFEST.unlink(missing_ok=True)
+    result = subprocess.run(
+        [sys.executable, '-m', 'manim', f'{module}.py', scene, '-ql', '--media_dir', str(HERE / 'media' / 'tex_scan')],
+        cwd=HERE, env={**os.environ, 'TEX_SCAN': '1'}, stdout=subprocess.DEVNULL,
+    )
+    if result.returncode != 0 or not SCAN_MANIFEST.exists():
+        return None
+    os.replace(SCAN_MANIFEST, MANIFEST)
+    global _recorded
+    _recorded = None
+    return len(read_manifest())
+
+
+def is_stale():
+    if not MANIFEST.exists():
+        return True
+    built = MANIFEST.stat().st_mtime
+    return any((HERE / source).stat().st_mtime > built for source in DECK_SOURCES)
+
+
+def collect(force=False):
+    """Scan the deck if the manifest is older than its sources, then compile what is missing."""
+    if force or is_stale():
+        scan()
+    return prepare()
+
+
+def install(scan=False):
+    global _scanning
+    _scanning = scan
+    from manim import config
+    from manim.utils import tex_file_writing
+    try:
+        from manim.mobject.text import tex_mobject
+    except ImportError:  # manim < 0.16
+        from manim.mobject.svg import tex_mobject
+
+    compile_single = tex_file_writing.tex_to_svg_file
+
+    def tex_to_svg_file(expression, environment=None, tex_template=None):
+        if tex_template is None:
+            tex_template = config['tex_template']
+        if environment is not None:
+            code = tex_template.get_texcode_for_expression_in_env(expression, environment)
+        else:
+            code = tex_template.get_texcode_for_expression(expression)
+        key = record(code, tex_template.tex_compiler, tex_template.output_format)
+        svg = cached_svg(key)
+        if svg is None and _scanning:
+            placeholder = CACHE_DIR / 'placeholder.svg'
+            if not placeholder.exists():
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                placeholder.write_text(PLACEHOLDER_SVG)
+            return str(placeholder)
+        if svg is None:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            svg = CACHE_DIR / f'{key}.svg'
+            shutil.copyfile(compile_single(expression, environment=environment, tex_template=tex_template), svg)
+        return str(svg)
+
+    tex_mobject.tex_to_svg_file = tex_to_svg_file
+
+
+if __name__ == '__main__':
+    print(f'Compiled {collect(force=True)} TeX documents')
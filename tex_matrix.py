@@ -0,0 +1,105 @@
+"""Matrices whose entries are all typeset by a single TeX compilation.
+
+Manim's Matrix makes one MathTex per entry, so one LaTeX run (or cache
+lookup) and one SVG parse per entry. Here all the entries are put in a single
+formula, each one in its own color, and the glyphs of the resulting SVG are
+sorted back into the entries by their color. The entries are then colored
+normally and laid out by Matrix as usual.
+
+If the colors can't be matched back (an entry without any glyph, for example)
+every entry is typeset on its own, like Manim does, with a warning.
+`python tex_matrix.py` checks that a sample matrix is cut back properly.
+"""
+import sys
+
+from manim import WHITE, Matrix, MathTex, SingleStringMathTex, VMobject, logger
+from manim.utils.color import color_to_rgb
+
+import tex_cache
+
+
+class TexCell(VMobject):
+    """One entry cut out of a formula. Colors by tex like a one part MathTex."""
+
+    def __init__(self, tex_string, glyphs, color=WHITE, **kwargs):
+        super().__init__(**kwargs)
+        self.tex_string = tex_string
+        self.add(*glyphs)
+        self.set_color(color)
+
+    def get_tex_string(self):
+        return self.tex_string
+
+    def set_color_by_tex(self, tex, color, **kwargs):
+        if tex in self.tex_string:
+            self.set_color(color)
+        return self
+
+
+def code_color(index):
+    # index + 1, so that no entry is black like uncolored glyphs
+    code = index + 1
+    return code >> 16 & 255, code >> 8 & 255, code & 255
+
+
+def glyph_code(glyph):
+    r, g, b = (int(round(x * 255)) for x in color_to_rgb(glyph.get_fill_color()))
+    return (r << 16 | g << 8 | b) - 1
+
+
+def split_glyphs(mob, count):
+    """The glyphs of every entry, or the reason they can't be sorted out."""
+    glyphs = [[] for _ in range(count)]
+    for glyph in mob.family_members_with_points():
+        code = glyph_code(glyph)
+        if not 0 <= code < count:
+            return None, f'a glyph has color code {code}, not one of the {count} entries'
+        glyphs[code].append(glyph)
+    empty = [i for i, cell in enumerate(glyphs) if len(cell) == 0]
+    if empty:
+        return None, f'entries {empty} have no glyph'
+    return glyphs, None
+
+
+def tex_cells(tex_strings, color=WHITE, **kwargs):
+    """One mobject per tex string, all from a single compilation."""
+    tex_strings = [str(tex) for tex in tex_strings]
+    formula = r' \quad '.join(
+        r'{\color[RGB]{%d,%d,%d} %s}' % (*code_color(i), tex)
+        for i, tex in enumerate(tex_strings)
+    )
+    mob = SingleStringMathTex(formula, **kwargs)
+    if tex_cache.scanning():
+        # only a placeholder to sort out, what matters is that the formula was recorded
+        return [TexCell(string, [glyph.copy() for glyph in mob.family_members_with_points()], color=color) for string in tex_strings]
+    glyphs, reason = split_glyphs(mob, len(tex_strings))
+    if glyphs is None:
+        logger.warning(f'TexMatrix: typesetting {len(tex_strings)} entries one by one, {reason}')
+        return [MathTex(tex, color=color, **kwargs) for tex in tex_strings]
+    return [TexCell(tex, cell, color=color) for tex, cell in zip(tex_strings, glyphs)]
+
+
+class TexMatrix(Matrix):
+    """Matrix typesetting all its entries at once (see tex_cells)."""
+
+    def _matrix_to_mob_matrix(self, matrix):
+        rows = [[str(item) for item in row] for row in matrix]
+        cells = tex_cells([tex for row in rows for tex in row], **self.element_to_mobject_config)
+        width = len(rows[0]) if rows else 0
+        return [cells[i:i + width] for i in range(0, len(cells), width)]
+
+
+SAMPLE = [['1', '0', r'\frac{1}{2}'], ['x_{n-1}', r'\sum_i a_i', '-3']]
+
+
+def check():
+    """Whether the entries of SAMPLE are cut back from one formula (no fallback)."""
+    tex_strings = [tex for row in SAMPLE for tex in row]
+    cells = tex_cells(tex_strings)
+    return all(isinstance(cell, TexCell) for cell in cells)
+
+
+if __name__ == '__main__':
+    if not check():
+        sys.exit('TexMatrix falls back to one MathTex per entry, see the warning above')
+    print('TexMatrix typesets a sample matrix in a single compilation')
@@ -0,0 +1,75 @@
+"""On-disk cache of the paths of the Text (Pango) mobjects of the deck.
+
+Manim keeps the SVG Pango writes for a Text, but still parses it into paths
+for every Text it builds, in every render. cached_text() keeps the parsed
+paths instead: the points and the colors of every glyph of the Text, in
+CACHE_DIR under a hash of the string, of the Text arguments (font, font size,
+color, ...) and of the Manim version. On a hit, no Pango and no SVG parsing.
+
+It returns a CachedText, a plain VMobject with one submobject per glyph, which
+looks and animates like the Text it was made of.
+"""
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from manim import Text, VMobject
+from manim import __version__ as manim_version
+
+HERE = Path(__file__).resolve().parent
+CACHE_DIR = HERE / 'media' / 'text_cache'
+
+STYLE = ('fill_rgbas', 'stroke_rgbas', 'background_stroke_rgbas')
+
+
+def text_key(text, kwargs):
+    settings = json.dumps([text, {k: str(v) for k, v in sorted(kwargs.items())}, manim_version])
+    return hashlib.sha256(settings.encode()).hexdigest()[:32]
+
+
+class CachedText(VMobject):
+    def __init__(self, text, glyphs, **kwargs):
+        super().__init__(**kwargs)
+        self.text = text
+        self.add(*glyphs)
+
+
+def save(path, glyphs):
+    arrays = {}
+    for i, glyph in enumerate(glyphs):
+        arrays[f'{i}.points'] = glyph.points
+        arrays[f'{i}.stroke_width'] = np.array(glyph.stroke_width)
+        for attr in STYLE:
+            if hasattr(glyph, attr):
+                arrays[f'{i}.{attr}'] = getattr(glyph, attr)
+    buffer = io.BytesIO()
+    np.savez(buffer, count=len(glyphs), **arrays)
+    # written under its final name only when complete, renders run in parallel
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_bytes(buffer.getvalue())
+    os.replace(tmp, path)
+
+
+def load(path):
+    glyphs = []
+    with np.load(path) as data:
+        for i in range(int(data['count'])):
+            glyph = VMobject()
+            glyph.set_points(data[f'{i}.points'])
+            glyph.stroke_width = float(data[f'{i}.stroke_width'])
+            for attr in STYLE:
+                if f'{i}.{attr}' in data:
+                    setattr(glyph, attr, data[f'{i}.{attr}'])
+            glyphs.append(glyph)
+    return glyphs
+
+
+def cached_text(text, **kwargs):
+    path = CACHE_DIR / f'{text_key(text, kwargs)}.npz'
+    if not path.exists():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        save(path, Text(text, **kwargs).family_members_with_points())
+    return CachedText(text, load(path))
@@ -1,14 +1,113 @@
+import os
+
 from manim import *
 # or: from manimlib import *
+from manim.utils.exceptions import EndSceneEarlyException
 from manim_slides import Slide
 
-DEV=False
+import multi_output
+import slide_cache
+import brute
+import static_frames
+import stills
+import tex_cache
+from render_trace import RenderTrace
+from recurrence import SPEC, compile_spec
+from tex_matrix import TexMatrix, tex_cells
+from text_cache import cached_text
+
+# Draft mode, for iterating on the deck (also see `python render.py --draft`):
+#   DRAFT=1       render in low quality (480p15)
+#   DRAFT_FROM=x  start from the section named x (e.g. dp_optimization), or from
+#                 slide number x. Nothing before it is rendered.
+#   DRAFT_UPTO=x  stop after slide number x
+# Slide numbers count the pause() calls of the rendered scene, starting from 0.
+DRAFT = os.environ.get('DRAFT', '0') not in ('', '0')
+DRAFT_FROM = os.environ.get('DRAFT_FROM') or None
+DRAFT_UPTO = os.environ.get('DRAFT_UPTO') or None
+
+if DRAFT:
+    config.quality = 'low_quality'
+
+# RENDER_TRACE=<file> writes the timing of every play of the render to that file
+# (.json or .csv, see render_trace.py). {scene} is replaced by the scene name.
+RENDER_TRACE = os.environ.get('RENDER_TRACE') or None
+
+# Frames that can not differ from the previous one are not redrawn, and holds
+# are encoded by ffmpeg from a single frame (see static_frames.py).
+# STATIC_FRAMES=0 turns it off.
+STATIC_FRAMES = os.environ.get('STATIC_FRAMES', '1') != '0'
+
+# The copies made by transform_copy are removed once they are not needed to
+# show their target any more, instead of piling up until the next clear().
+# COLLAPSE_COPIES=0 turns it off.
+COLLAPSE_COPIES = os.environ.get('COLLAPSE_COPIES', '1') != '0'
+# REPORT_SLIDES=1 logs the number of mobjects on screen, and the memory of
+# their points, at the end of every slide.
+REPORT_SLIDES = os.environ.get('REPORT_SLIDES', '0') not in ('', '0')
+
+# PROXIES=720p30[,...] also encodes these smaller versions of the video, and
+# their slides, in the same render (see multi_output.py).
+PROXIES = multi_output.parse_proxies(os.environ.get('PROXIES', ''))
+
+# INCREMENTAL=1 only renders the slides whose content changed since the last
+# render, the others reuse their partial movies (see slide_cache.py). It replaces
+# manim's own caching, which hashes the whole scene at every play.
+INCREMENTAL = os.environ.get('INCREMENTAL', '0') not in ('', '0')
+# With SLIDE_REPORT=<file> ({scene} is replaced), an incremental render also
+# writes which slides it rendered and which it reused (used by farm.py).
+SLIDE_REPORT = os.environ.get('SLIDE_REPORT') or None
+
+# The formula and the matrices of the deck, generated from the recurrence spec.
+RECURRENCE = compile_spec(SPEC)
+# the parts of the formula dp_formula animates one by one
+DP_FORMULA_PARTS = [
+    'cnt.lhs', 'cnt.eq', 'sum.lhs', 'sum.eq', 'cnt.prev.0', 'sum.prev.0',
+    *(f'{row}.{what}.{k}' for k in (1, 2) for row in ('cnt', 'sum') for what in ('plus', 'coef', 'cdot', 'prev')),
+    *(f'cover.{what}.{k}' for k in (1, 2) for what in ('plus', 'cdot', 'weight', 'wcdot', 'prev')),
+    'cover.coef.2',
+]
+
+# STILLS=<dir> renders no video at all, only one PNG per slide with the frame
+# it ends on (see stills.py). The other modes above are ignored then.
+STILLS = os.environ.get('STILLS') or None
+
+# Tilings shown by the TilingExamples scene: EXAMPLES of the 2 x EXAMPLES_N
+# board, all of them if there are not more, sampled uniformly otherwise
+# (with EXAMPLES_SEED).
+EXAMPLES_N = int(os.environ.get('EXAMPLES_N', 12))
+EXAMPLES = int(os.environ.get('EXAMPLES', 5))
+EXAMPLES_SEED = int(os.environ.get('EXAMPLES_SEED', 0))
+
+# TEX_SCAN=1 goes through the deck only to list the TeX it needs, without
+# compiling or rendering anything (used by tex_cache.scan).
+TEX_SCAN = os.environ.get('TEX_SCAN', '0') not in ('', '0')
+
+if STILLS is not None or TEX_SCAN:
+    config.write_to_movie = False
+    INCREMENTAL = False
+    PROXIES = []
+
+if INCREMENTAL:
+    config.disable_caching = True
+
+# All Tex/MathTex go through one content addressed cache, see tex_cache.py
+tex_cache.install(scan=TEX_SCAN)
 
 TITLE_SCALING = 0.7
 SUBTITLE_SCALING = 0.5
 TEXT_SCALE=0.6
 STEP=0.5
 
+# The deck is split in sections. Each one can also be rendered as its own scene
+# (see the *Section scenes at the bottom and render.py).
+SECTIONS = ['intro', 'problem_statement', 'dp_formula', 'dp_optimization']
+SUBTITLES = {
+    'problem_statement': 'Tóm tắt đề bài',
+    'dp_formula': 'Lời giải: công thức quy hoạch động',
+    'dp_optimization': 'Lời giải: tối ưu hóa quy hoạch động',
+}
+
 class LShapePiece(Polygon):
     def __init__(self, rot=0):
         assert(rot % 90 == 0)
@@ -42,7 +141,10 @@ class Floor(Rectangle):
         if from_back:
             pos = self.n - 2 - pos
         ans = self.get_center() if from_center else [0, 0, 0]
-        return ans + (pos - self.n * 0.5 + 1) * STEP * RIGHT
+        return ans + (pos - self.n * 0.5 + 1) * STEP * RIGHT * self.get_scale()
+    
+    def get_scale(self):
+        return self.width / (STEP * self.n)
     
 class InfiniteFloor(VGroup):
     def __init__(self, n, *args, **kwargs):
@@ -79,8 +181,128 @@ class InfiniteFloor(VGroup):
         return self.height / self.org_height
     
 
+class FloorGroup(VGroup):
+    def __init__(self, sub, pieces=[]):
+        self.n = 8
+        self.sub = sub
+        self.inf_floor = prototype(InfiniteFloor, self.n)
+        self.n_text = MathTex("n").next_to(self.inf_floor, UP).scale(TEXT_SCALE)
+        self.up_brace = Brace(self.inf_floor, UP)
+        
+        self.n_sub_text = MathTex(f"n - {sub}").scale(TEXT_SCALE)
+        p1 = self.inf_floor.get_coor(-1)
+        p2 = self.inf_floor.get_coor(self.n - 1 - sub)
+        self.down_brace = BraceBetweenPoints(p1, p2)
+        self.n_sub_text.next_to(self.down_brace, DOWN)
+        objs = [self.n_text, self.up_brace, self.inf_floor, self.down_brace, self.n_sub_text]
+        
+        super().__init__(*objs)
+        self.arrange(DOWN, coor_mask=[0, 1, 0], buff=0.1)
+        
+        self.filling_area = Rectangle(
+                width=STEP * sub,
+                height=STEP * 2,
+                color=YELLOW,
+                fill_color=YELLOW,
+                fill_opacity=0.2
+        ).move_to(self.inf_floor.get_coor(-1 + sub * 0.5, from_back=True))
+        
+        self.add(self.filling_area)
+        
+        for piece in pieces:
+            self.add(piece[0].move_to(self.inf_floor.get_coor(piece[1], from_back=True)))
+        self.scale(0.5)
+        
+
+# Building the mobjects above takes much longer than copying them (InfiniteFloor
+# has two gridded floors, FloorGroup has MathTex and braces), and the deck uses
+# the same few variants again and again. So each one is built once, and the deck
+# gets copies of it.
+prototypes = {}
+
+def prototype(cls, *args):
+    key = (cls, *args)
+    if key not in prototypes:
+        prototypes[key] = cls(*args)
+    return prototypes[key].copy()
+
+
+# A tiling is a tuple of (rot, col) pieces, like the ones of brute.py. Gives
+# copies of the pieces of palette (rot -> LShapePiece) for it, and the
+# animations moving them to their place on floor.
+def place_tiling(floor, tiling, palette):
+    pieces = [palette[rot].copy() for rot, col in tiling]
+    return pieces, [piece.animate.move_to(floor.get_coor(col)) for piece, (rot, col) in zip(pieces, tiling)]
+
+
 class HallwayTilingTutorial(Slide):
+    sections = SECTIONS
+    outputs = None
+    
+    def render(self, *args, **kwargs):
+        if STILLS is not None or TEX_SCAN:
+            # there are no movies to make slides from
+            return Scene.render(self, *args, **kwargs)
+        super().render(*args, **kwargs)
+        if self.outputs is not None:
+            self.outputs.finish()
+        
     def construct(self):
+        self.setup_deck()
+        self.static_frames = static_frames.install(self) if STATIC_FRAMES else None
+        self.outputs = multi_output.install(self, PROXIES, holds=self.static_frames)
+        self.stills = None if STILLS is None else stills.Stills(self, STILLS)
+        self.shown_copies = []
+        self.trace = None
+        if RENDER_TRACE is not None:
+            self.trace = RenderTrace(self, RENDER_TRACE.format(scene=type(self).__name__), holds=self.static_frames)
+        
+        self.slide_index = 0
+        self.skip_until_slide = 0
+        self.stop_after_slide = None if DRAFT_UPTO is None else int(DRAFT_UPTO)
+        sections = self.sections
+        if DRAFT_FROM in SECTIONS:
+            if DRAFT_FROM not in sections:
+                raise ValueError(
+                    f'DRAFT_FROM={DRAFT_FROM} is not a section of {type(self).__name__} ({", ".join(sections)}), '
+                    'render HallwayTilingTutorial or the scene of that section'
+                )
+            sections = sections[sections.index(DRAFT_FROM):]
+        elif DRAFT_FROM is not None:
+            self.skip_until_slide = int(DRAFT_FROM)
+        
+        self.slide_cache = None
+        if INCREMENTAL:
+            report = None if SLIDE_REPORT is None else SLIDE_REPORT.format(scene=type(self).__name__)
+            self.slide_cache = slide_cache.SlideCache(self, SECTIONS, extra=[RECURRENCE.matrix_text, RECURRENCE.formula.parts, PROXIES, STATIC_FRAMES, COLLAPSE_COPIES], report=report)
+        
+        self.restore_state(sections[0])
+        
+        self.section = None
+        for section in sections:
+            if self.slide_cache is not None and self.section is not None:
+                self.slide_cache.close(self.slide_key())
+            self.section = section
+            self.section_first_slide = self.slide_index
+            getattr(self, section)()
+        # ignore this. This was in the original version
+        # self.basic_direction()
+        
+        if self.sections[-1] == SECTIONS[-1]:
+            self.wait()
+            if self.stills is not None:
+                self.stills.capture(self.slide_index, self.section)
+        if self.slide_cache is not None:
+            self.slide_cache.close(self.slide_key())
+        
+    # which part of which slide the current play is in, for the slide cache
+    def slide_key(self):
+        return self.slide_cache.key(self.section, self.slide_index - self.section_first_slide)
+        
+    def setup_deck(self):
+        # compile everything the previous renders asked for in one LaTeX run
+        tex_cache.prepare()
+        
         latex_packages = [
                 r"\usepackage[utf8]{inputenc}",
                 r"\usepackage[vietnamese]{babel}",
@@ -90,36 +312,47 @@ class HallwayTilingTutorial(Slide):
         # self.texTemplate.add_to_preamble(r"\usepackage[utf8]{vietnam}")
         
         self.subtitle = None
-        # The comment are part number. There are a lot of parts so it would be easier to mark it myself
-        self.formulas = MathTex(r"""
-        % 1         2    3                4       5       6     7                 8             9     10     11                 12
-        {{ cnt_i }} & =  {{ cnt_{i - 1} }} & & +  {{ 4 }} \cdot {{ cnt_{i - 2} }}        & & + {{ 2 }} \cdot {{ cnt_{i - 3} }}  \\
-        % 13        14   15                 16     17     18    19                20            21      22    23                24
-        {{ sum_i }} & =  {{ sum_{i - 1} }} & & +  {{ 4 }} \cdot {{ sum_{i - 2} }}        & & + {{ 2 }} \cdot {{ sum_{i - 3} }}  \\
-        %                                           25    26    27      28    29                 30     31      32   33     34      35
-                    &                      & & +  {{ 4 }} \cdot {{ 3 }} \cdot {{ cnt_{i - 2}  }} & & + {{ 2 }} \cdot {{ 6 }} \cdot {{ cnt_{i - 3} }}
-        """).set_color_by_tex('cnt', YELLOW).set_color_by_tex('sum', RED).scale(TEXT_SCALE)
-        
-        self.intro()
-        self.problem_statement()
-        # ignore this. This was in the original version
-        # self.basic_direction()
-        self.dp_formula()
-        self.dp_optimization()
+        # The parts of the formula and the names of the ones the slides animate
+        # are generated from the recurrence spec (see recurrence.py).
+        self.parts = RECURRENCE.formula
+        self.formulas = self.set_tex_color(MathTex(*self.parts.parts)).scale(TEXT_SCALE)
+        
+    # Puts on screen what the previous sections left there, without playing anything.
+    # This way a section does not care if it is rendered alone or after the others.
+    def restore_state(self, section):
+        done = SECTIONS[:SECTIONS.index(section)]
+        if 'intro' in done:
+            self.title = self.make_title().to_edge(UP).scale(TITLE_SCALING)
+            self.title_underline = self.make_title_underline()
+            self.add(self.title, self.title_underline)
+        
+        subtitles = [SUBTITLES[i] for i in done if i in SUBTITLES]
+        if len(subtitles) > 0:
+            self.subtitle = self.make_subtitle(subtitles[-1])
+            self.add(self.subtitle)
         
-        self.wait()
+        if 'dp_formula' in done:
+            self.formulas.next_to(self.make_definition(), DOWN)
+            self.add(self.formulas)
         
     def intro(self):
-        self.title = Text('Hallway Tiling tutorial')
+        self.title = self.make_title()
         self.play(Create(self.title))
         self.pause()
         self.play(self.title.animate.to_edge(UP).scale(TITLE_SCALING))
-        self.title_underline = Line(LEFT, RIGHT).next_to(self.title, DOWN * 0.5)
-        self.title_underline.width = config['frame_width'] - 1
+        self.title_underline = self.make_title_underline()
         self.play(Create(self.title_underline, run_time=0.5))
         
+    def make_title(self):
+        return cached_text('Hallway Tiling tutorial')
+    
+    def make_title_underline(self):
+        underline = Line(LEFT, RIGHT).next_to(self.title, DOWN * 0.5)
+        underline.width = config['frame_width'] - 1
+        return underline
+        
     def problem_statement(self):
-        self.set_subtitle('Tóm tắt đề bài')
+        self.set_subtitle(SUBTITLES['problem_statement'])
         statement_text = r"Cho một bảng hình chữ nhật có kích thước $2 \times n$ ($n \le 10^{18}$). " \
                 r"Có thể xếp một vài miếng ghép hình chữ L vào bảng. " \
                 r"Tính tổng độ bao phủ của bảng."
@@ -127,11 +360,12 @@ class HallwayTilingTutorial(Slide):
         self.statement.next_to(self.subtitle, DOWN)
         self.add(self.statement)
         self.play(FadeIn(self.statement))
-        p0 = LShapePiece()
-        p90 = LShapePiece(rot=90)
-        p180 = LShapePiece(rot=180)
-        p270 = LShapePiece(rot=270)
+        p0 = prototype(LShapePiece, 0)
+        p90 = prototype(LShapePiece, 90)
+        p180 = prototype(LShapePiece, 180)
+        p270 = prototype(LShapePiece, 270)
         piece_group = VGroup(p0, p90, p270, p180).arrange()
+        palette = {0: p0, 90: p90, 180: p180, 270: p270}
         piece_group.next_to(self.statement, DOWN)
         self.play(FadeIn(piece_group))
         
@@ -141,7 +375,7 @@ class HallwayTilingTutorial(Slide):
         # examples
         
         n = 6
-        floor = Floor(n)
+        floor = prototype(Floor, n)
         x = p0.copy()
         floor.next_to(piece_group, DOWN * 3)
         
@@ -157,43 +391,21 @@ class HallwayTilingTutorial(Slide):
         # empty
         self.pause()
         
-        # example 1
-        e1 = p90.copy()
-        self.play(
-            e1.animate.move_to(floor.get_coor(2)),
-            Transform(coverage_text, make_coverage_text(3))
-        )
-        
-        self.pause()
-        
-        # example 2
-        e21 = p0.copy()
-        e22 = p270.copy()
-        self.play(
-            FadeOut(e1),
-            e21.animate.move_to(floor.get_coor(0)),
-            e22.animate.move_to(floor.get_coor(3)),
-            Transform(coverage_text, make_coverage_text(6))
-        )
-        
-        self.pause()
-        
-        # example 3
-        e31 = p0.copy()
-        e32 = p90.copy()
-        e33 = p180.copy()
-        e34 = p270.copy()
-        self.play(
-            FadeOut(e21),
-            FadeOut(e22),
-            e34.animate.move_to(floor.get_coor(0)),
-            e32.animate.move_to(floor.get_coor(1)),
-            e31.animate.move_to(floor.get_coor(3)),
-            e33.animate.move_to(floor.get_coor(4)),
-            Transform(coverage_text, make_coverage_text(12))
-        )
-        
-        self.pause()
+        shown = []
+        for tiling in [
+            ((90, 2),),
+            ((0, 0), (270, 3)),
+            ((270, 0), (90, 1), (0, 3), (180, 4)),
+        ]:
+            pieces, moves = place_tiling(floor, tiling, palette)
+            self.play(
+                *(FadeOut(piece) for piece in shown),
+                *moves,
+                Transform(coverage_text, make_coverage_text(brute.coverage(tiling)))
+            )
+            shown = pieces
+            
+            self.pause()
         
         self.clear()
         
@@ -211,8 +423,8 @@ class HallwayTilingTutorial(Slide):
         VGroup(count_text, sum_text).arrange(buff=2)
         self.play(expected_value_text.animate.next_to(self.subtitle, DOWN * 2))
         self.play(
-                Transform(expected_value_text.copy(), count_text),
-                Transform(expected_value_text.copy(), sum_text)
+                self.transform_copy(expected_value_text, count_text),
+                self.transform_copy(expected_value_text, sum_text)
             )
         self.play(
                 FadeIn(Arrow(start=expected_value_text.get_corner(DOWN), end=count_text.get_corner(UP))),
@@ -229,8 +441,8 @@ class HallwayTilingTutorial(Slide):
         # ans_text.set_color_by_text("cnt", "yellow")
         
         self.play(
-                Transform(count_text.copy(), ans_text),
-                Transform(sum_text.copy(), ans_text)
+                self.transform_copy(count_text, ans_text),
+                self.transform_copy(sum_text, ans_text)
         )
         self.play(
                 FadeIn(Arrow(start=count_text.get_corner(DOWN), end=ans_text.get_corner(UP))),
@@ -242,74 +454,39 @@ class HallwayTilingTutorial(Slide):
         self.clear()
         
     def dp_formula(self):
-        self.set_subtitle('Lời giải: công thức quy hoạch động')
+        self.set_subtitle(SUBTITLES['dp_formula'])
         
-        definition_text = r"""
-        Gọi {{ $cnt_i$ }} là số lượng cách xếp cho hình chữ nhật kích thước $2 \times i$
-        
-        Gọi {{ $sum_i$ }} là tổng bao phủ trong tất cả các cách xếp hình chữ nhật kích thước $2 \times i$
-        """
-        
-        definition = self.tex(definition_text, tex_environment=None).next_to(self.subtitle, DOWN, buff=0.1).scale(TEXT_SCALE)
-        definition.set_color_by_tex('cnt', YELLOW)
-        definition.set_color_by_tex('sum', RED)
+        definition = self.make_definition()
         
         self.play(FadeIn(definition))
         self.pause()
         
-        class FloorGroup(VGroup):
-            def __init__(self, sub, pieces=[]):
-                self.n = 8
-                self.sub = sub
-                self.inf_floor = InfiniteFloor(self.n)
-                self.n_text = MathTex("n").next_to(self.inf_floor, UP).scale(TEXT_SCALE)
-                self.up_brace = Brace(self.inf_floor, UP)
-                
-                self.n_sub_text = MathTex(f"n - {sub}").scale(TEXT_SCALE)
-                p1 = self.inf_floor.get_coor(-1)
-                p2 = self.inf_floor.get_coor(self.n - 1 - sub)
-                self.down_brace = BraceBetweenPoints(p1, p2)
-                self.n_sub_text.next_to(self.down_brace, DOWN)
-                objs = [self.n_text, self.up_brace, self.inf_floor, self.down_brace, self.n_sub_text]
-                
-                super().__init__(*objs)
-                self.arrange(DOWN, coor_mask=[0, 1, 0], buff=0.1)
-                
-                self.filling_area = Rectangle(
-                        width=STEP * sub,
-                        height=STEP * 2,
-                        color=YELLOW,
-                        fill_color=YELLOW,
-                        fill_opacity=0.2
-                ).move_to(self.inf_floor.get_coor(-1 + sub * 0.5, from_back=True))
-                
-                self.add(self.filling_area)
-                
-                for piece in pieces:
-                    self.add(piece[0].move_to(self.inf_floor.get_coor(piece[1], from_back=True)))
-                self.scale(0.5)
-                
         formulas = self.formulas
+        parts = self.parts
+        # the slides go through the terms of the hallway recurrence one by one
+        if RECURRENCE.order != 3:
+            raise ValueError(f'dp_formula shows recurrences of order 3, the spec has order {RECURRENCE.order}')
+        parts.require(DP_FORMULA_PARTS, 'dp_formula')
             
         formulas.next_to(definition, DOWN)
         
-        self.play(Write(formulas[1:3]), Write(formulas[13:15]))
+        self.play(Write(formulas[parts.span('cnt.lhs', 'cnt.eq')]), Write(formulas[parts.span('sum.lhs', 'sum.eq')]))
         
         
-        g1 = FloorGroup(1).next_to(formulas, DOWN)
+        g1 = prototype(FloorGroup, 1).next_to(formulas, DOWN)
         self.play(FadeIn(g1))
         self.wait()
         self.pause()
         
-        self.play(Transform(g1.n_sub_text.copy(), formulas[3]))
+        self.play(self.transform_copy(g1.n_sub_text, formulas[parts['cnt.prev.0']]))
         self.pause()
-        self.play(Transform(g1.n_sub_text.copy(), formulas[15]))
+        self.play(self.transform_copy(g1.n_sub_text, formulas[parts['sum.prev.0']]))
         self.pause()
         
-        self.play(Transform(g1, FloorGroup(2).move_to(g1.get_center())))
+        self.play(Transform(g1, prototype(FloorGroup, 2).move_to(g1.get_center())))
         self.pause()
         
-        g2 = [FloorGroup(2) for i in range(4)]
+        g2 = [prototype(FloorGroup, 2) for i in range(4)]
         g2g = VGroup(*g2).arrange_in_grid(row=2, col=2).next_to(formulas, DOWN)
         self.play(Transform(g1, g2[0]))
         g1copy = [g1.copy() for i in range(4)]
@@ -317,7 +494,7 @@ class HallwayTilingTutorial(Slide):
         
         pieces = []
         for i in range(4):
-            piece = LShapePiece(i * 90).scale(0.5)
+            piece = prototype(LShapePiece, i * 90).scale(0.5)
             piece.move_to(g2[i].inf_floor.get_coor(0, from_back=True))
             pieces.append(piece)
         
@@ -325,24 +502,24 @@ class HallwayTilingTutorial(Slide):
         self.pause()
         
         n_sub_texts = [i.n_sub_text for i in g2]
-        self.play(Write(formulas[4:7]), *(Transform(i.copy(), formulas[7]) for i in n_sub_texts))
+        self.play(Write(formulas[parts.span('cnt.plus.1', 'cnt.cdot.1')]), *(self.transform_copy(i, formulas[parts['cnt.prev.1']]) for i in n_sub_texts))
         self.wait()
         self.pause()
         
-        self.play(Write(formulas[16:19]), *(Transform(i.copy(), formulas[19]) for i in n_sub_texts))
+        self.play(Write(formulas[parts.span('sum.plus.1', 'sum.cdot.1')]), *(self.transform_copy(i, formulas[parts['sum.prev.1']]) for i in n_sub_texts))
         self.wait()
         self.pause()
         
         self.play(
-            Write(formulas[24:27]), 
-            *(Transform(i.copy(), formulas[27:28]) for i in pieces)
+            Write(formulas[parts.span('cover.plus.1', 'cover.cdot.1')]), 
+            *(self.transform_copy(i, formulas[parts.span('cover.weight.1')]) for i in pieces)
         )
                   
         self.wait();
         self.pause()
         
         self.play(
-            *(Transform(i.copy(), formulas[28:30]) for i in n_sub_texts)
+            *(self.transform_copy(i, formulas[parts.span('cover.wcdot.1', 'cover.prev.1')]) for i in n_sub_texts)
         )
         self.wait()
         self.pause()
@@ -351,7 +528,7 @@ class HallwayTilingTutorial(Slide):
         self.play(g1.animate.next_to(formulas, DOWN))
         self.pause()
         
-        self.play(Transform(g1, FloorGroup(3).next_to(formulas, DOWN)))
+        self.play(Transform(g1, prototype(FloorGroup, 3).next_to(formulas, DOWN)))
         self.pause()
         
         g3 = VGroup(g1.copy(), g1.copy()).arrange(LEFT).next_to(formulas, DOWN)
@@ -366,8 +543,8 @@ class HallwayTilingTutorial(Slide):
         self.pause()
         
         pieces = [
-            LShapePiece(0).move_to(g1.inf_floor.get_coor(1, from_back=True)), LShapePiece(180).move_to(g1.inf_floor.get_coor(0, from_back=True)),
-            LShapePiece(270).move_to(g1copy.inf_floor.get_coor(1, from_back=True)), LShapePiece(90).move_to(g1copy.inf_floor.get_coor(0, from_back=True))
+            prototype(LShapePiece, 0).move_to(g1.inf_floor.get_coor(1, from_back=True)), prototype(LShapePiece, 180).move_to(g1.inf_floor.get_coor(0, from_back=True)),
+            prototype(LShapePiece, 270).move_to(g1copy.inf_floor.get_coor(1, from_back=True)), prototype(LShapePiece, 90).move_to(g1copy.inf_floor.get_coor(0, from_back=True))
         ]
         
         for piece in pieces:
@@ -377,24 +554,24 @@ class HallwayTilingTutorial(Slide):
         self.pause()
         
         n_sub_texts = [g1.n_sub_text, g1copy.n_sub_text]
-        self.play(Write(formulas[8:11]), *(Transform(i.copy(), formulas[11]) for i in n_sub_texts))
+        self.play(Write(formulas[parts.span('cnt.plus.2', 'cnt.cdot.2')]), *(self.transform_copy(i, formulas[parts['cnt.prev.2']]) for i in n_sub_texts))
         self.wait()
         self.pause()
         
-        self.play(Write(formulas[20:23]), *(Transform(i.copy(), formulas[23]) for i in n_sub_texts))
+        self.play(Write(formulas[parts.span('sum.plus.2', 'sum.cdot.2')]), *(self.transform_copy(i, formulas[parts['sum.prev.2']]) for i in n_sub_texts))
         self.wait()
         self.pause()
         
         self.play(
-            Write(formulas[30:32]), 
-            *(Transform(i.copy(), formulas[32:34]) for i in pieces)
+            Write(formulas[parts.span('cover.plus.2', 'cover.coef.2')]), 
+            *(self.transform_copy(i, formulas[parts.span('cover.cdot.2', 'cover.weight.2')]) for i in pieces)
         )
                   
         self.wait();
         self.pause()
         
         self.play(
-                *(Transform(i.copy(), formulas[34:36]) for i in n_sub_texts)
+                *(self.transform_copy(i, formulas[parts.span('cover.wcdot.2', 'cover.prev.2')]) for i in n_sub_texts)
         )
         self.wait()
         self.pause()
@@ -409,31 +586,37 @@ class HallwayTilingTutorial(Slide):
         self.add(self.formulas)
         self.clear(self.formulas)
         
+    def make_definition(self):
+        definition_text = r"""
+        Gọi {{ $cnt_i$ }} là số lượng cách xếp cho hình chữ nhật kích thước $2 \times i$
+        
+        Gọi {{ $sum_i$ }} là tổng bao phủ trong tất cả các cách xếp hình chữ nhật kích thước $2 \times i$
+        """
+        
+        definition = self.tex(definition_text, tex_environment=None).next_to(self.subtitle, DOWN, buff=0.1).scale(TEXT_SCALE)
+        definition.set_color_by_tex('cnt', YELLOW)
+        definition.set_color_by_tex('sum', RED)
+        return definition
+        
     def dp_optimization(self):
-        self.set_subtitle('Lời giải: tối ưu hóa quy hoạch động')
+        self.set_subtitle(SUBTITLES['dp_optimization'])
         
         self.play(self.formulas.animate.next_to(self.subtitle, DOWN))
         
         self.pause()
         
-        matrix_text = np.array([
-                ("~"            , "cnt_{i - 1}" , "cnt_{i - 2}" , "cnt_{i - 3}" , "sum_{i - 1}" , "sum_{i - 2}" , "sum_{i - 3}" ),
-                ("cnt_i"        , "1"           , "4"           , "2"           , "0"           , "0"           , "0"           ),
-                ("cnt_{i - 1}"  , "1"           , "0"           , "0"           , "0"           , "0"           , "0"           ),
-                ("cnt_{i - 2}"  , "0"           , "1"           , "0"           , "0"           , "0"           , "0"           ),
-                ("sum_i"        , "0"           , "4 \cdot 3"   , "2 \cdot 6"   , "1"           , "4"           , "2"           ),
-                ("sum_{i - 1}"  , "0"           , "0"           , "0"           , "1"           , "0"           , "0"           ),
-                ("sum_{i - 2}"  , "0"           , "0"           , "0"           , "0"           , "1"           , "0"           )
-                ])
+        matrix_text = np.array(RECURRENCE.matrix_text)
+        order = RECURRENCE.order
         
-        data_matrix = Matrix(matrix_text[1:,1:], h_buff=2, bracket_h_buff=1, element_alignment_corner=DOWN).scale(TEXT_SCALE)
+        data_matrix = TexMatrix(matrix_text[1:,1:], h_buff=2, bracket_h_buff=1, element_alignment_corner=DOWN).scale(TEXT_SCALE)
         matrix_row_labels = []
         matrix_col_labels = []
         data_matrix_entries = data_matrix.get_entries()
         row_cnt = len(matrix_text) - 1
+        labels = tex_cells([*matrix_text[1:, 0], *matrix_text[0, 1:]])
         for i in range(1, len(matrix_text)):
-            row_label = self.set_tex_color(MathTex(matrix_text[i, 0])).scale(TEXT_SCALE)
-            col_label = self.set_tex_color(MathTex(matrix_text[0, i])).scale(TEXT_SCALE)
+            row_label = self.set_tex_color(labels[i - 1]).scale(TEXT_SCALE)
+            col_label = self.set_tex_color(labels[row_cnt + i - 1]).scale(TEXT_SCALE)
             col_label.next_to(data_matrix_entries[i - 1], UP)
             row_label.next_to(data_matrix_entries[(i - 1) * row_cnt], LEFT, buff=1.6)
             matrix_col_labels.append(col_label)
@@ -453,27 +636,25 @@ class HallwayTilingTutorial(Slide):
         self.play(Write(sr))
         self.pause()
                 
-        self.play(
-            Transform(self.formulas[3].copy(), data_matrix_entries[0]),
-            Transform(self.formulas[5].copy(), data_matrix_entries[1]),
-            Transform(self.formulas[9].copy(), data_matrix_entries[2])
-        )
+        self.play(*(
+            self.transform_copy(self.formulas[self.parts.cell('cnt', k)], data_matrix_entries[k])
+            for k in range(order) if self.parts.cell('cnt', k) is not None
+        ))
         self.pause()
         
-        sr2 = SurroundingRectangle(data_matrix.get_rows()[3])
+        sr2 = SurroundingRectangle(data_matrix.get_rows()[order])
         self.play(Unwrite(sr), Write(sr2))
         self.pause()
         
-        self.play(
-            Transform(self.formulas[15].copy(), data_matrix_entries[3 * row_cnt + 3]),
-            Transform(self.formulas[17].copy(), data_matrix_entries[3 * row_cnt + 4]),
-            Transform(self.formulas[21].copy(), data_matrix_entries[3 * row_cnt + 5])
-        )
+        self.play(*(
+            self.transform_copy(self.formulas[self.parts.cell('sum', k)], data_matrix_entries[order * row_cnt + order + k])
+            for k in range(order) if self.parts.cell('sum', k) is not None
+        ))
         self.pause()
-        self.play(
-            Transform(self.formulas[25:28].copy(), data_matrix_entries[3 * row_cnt + 1]),
-            Transform(self.formulas[31:34].copy(), data_matrix_entries[3 * row_cnt + 2])
-        )
+        self.play(*(
+            self.transform_copy(self.formulas[self.parts.cell('cover', k)], data_matrix_entries[order * row_cnt + k])
+            for k in range(order) if self.parts.cell('cover', k) is not None
+        ))
         self.pause()
         
         self.play(Unwrite(sr2))
@@ -504,8 +685,8 @@ class HallwayTilingTutorial(Slide):
         equal = MathTex("=").scale(TEXT_SCALE)
         cross = MathTex(r"\times").scale(TEXT_SCALE)
         
-        res_matrix = Matrix(matrix_text[1:,0:1], element_alignment_corner=DOWN).scale(TEXT_SCALE)
-        base_matrix = Matrix(matrix_text[0:1,1:].reshape(row_cnt, 1), element_alignment_corner=DOWN).scale(TEXT_SCALE)
+        res_matrix = TexMatrix(matrix_text[1:,0:1], element_alignment_corner=DOWN).scale(TEXT_SCALE)
+        base_matrix = TexMatrix(matrix_text[0:1,1:].reshape(row_cnt, 1), element_alignment_corner=DOWN).scale(TEXT_SCALE)
         
         for i in [*res_matrix.get_entries(), *base_matrix.get_entries()]:
             self.set_tex_color(i)
@@ -527,8 +708,8 @@ class HallwayTilingTutorial(Slide):
         self.add(res_matrix)
         self.add(base_matrix)
                 
-        res_matrix2 = Matrix(np.array([['cnt_n', 'cnt_{n - 1}', 'cnt_{n - 2}', 'sum_n', 'sum_{n - 1}', 'sum_{n - 2}']]).reshape(row_cnt, 1), element_alignment_corner=DOWN).scale(TEXT_SCALE).move_to(res_matrix.get_center())
-        base_matrix2 = Matrix(np.array([['cnt_0', 'cnt_{- 1}', 'cnt_{- 2}', 'sum_0', 'sum_{- 1}', 'sum_{- 2}']]).reshape(row_cnt, 1), element_alignment_corner=DOWN).scale(TEXT_SCALE).move_to(base_matrix.get_center())
+        res_matrix2 = TexMatrix(np.array(RECURRENCE.state_labels('n')).reshape(row_cnt, 1), element_alignment_corner=DOWN).scale(TEXT_SCALE).move_to(res_matrix.get_center())
+        base_matrix2 = TexMatrix(np.array(RECURRENCE.state_labels('0')).reshape(row_cnt, 1), element_alignment_corner=DOWN).scale(TEXT_SCALE).move_to(base_matrix.get_center())
         
         for i in [*res_matrix2.get_entries(), *base_matrix2.get_entries()]:
             self.set_tex_color(i)
@@ -550,14 +731,14 @@ class HallwayTilingTutorial(Slide):
         self.pause()
         
         with_text = self.tex('với').scale(TEXT_SCALE)
-        base_value_matrix = Matrix(np.array([1, 0, 0, 0, 0, 0]).reshape(row_cnt, 1)).scale(TEXT_SCALE * 0.7)
+        base_value_matrix = TexMatrix(np.array(RECURRENCE.base).reshape(row_cnt, 1)).scale(TEXT_SCALE * 0.7)
         base_matrix2_cpy = base_matrix2.copy().scale(0.7)
         
         equal_cpy2 = equal.copy()
         value_group = VGroup(with_text, base_matrix2_cpy, equal_cpy2, base_value_matrix).arrange().next_to(matrix_group3, DOWN)
         
         self.play(
-            Transform(base_matrix2.copy(), base_matrix2_cpy),
+            self.transform_copy(base_matrix2, base_matrix2_cpy),
             FadeIn(with_text),
             FadeIn(equal_cpy2),
             FadeIn(base_value_matrix)
@@ -566,8 +747,8 @@ class HallwayTilingTutorial(Slide):
         self.add(matrix_group3)
         self.clear(matrix_group3)
         
-        complexity_text = self.tex(r"""
-        Tối ưu này cho ta lời giải $O(6^3 \log n) = O(\log n)$
+        complexity_text = self.tex(rf"""
+        Tối ưu này cho ta lời giải $O({RECURRENCE.size}^3 \log n) = O(\log n)$
         """).scale(TEXT_SCALE).next_to(matrix_group3, DOWN, buff=1)
         self.play(Write(complexity_text))
         self.pause()
@@ -576,14 +757,17 @@ class HallwayTilingTutorial(Slide):
         
         
     def set_tex_color(self, tex_obj):
-        return tex_obj.set_color_by_tex('cnt', YELLOW).set_color_by_tex('sum', RED)
+        return tex_obj.set_color_by_tex(SPEC.count, YELLOW).set_color_by_tex(SPEC.total, RED)
         
     def tex(self, *args, **kwargs):
         return Tex(*args, tex_template=self.texTemplate, **kwargs)
         
+    def make_subtitle(self, subtitle):
+        return cached_text(subtitle, color='yellow').next_to(self.title, 0.5 * DOWN).scale(SUBTITLE_SCALING)
+        
     def set_subtitle(self, subtitle):
         old_subtitle = self.subtitle
-        self.subtitle = Text(subtitle, color='yellow').next_to(self.title, 0.5 * DOWN).scale(SUBTITLE_SCALING)
+        self.subtitle = self.make_subtitle(subtitle)
         if old_subtitle is not None:
             self.play(Transform(old_subtitle, self.subtitle), run_time=0.5)
             self.remove(old_subtitle)
@@ -591,7 +775,42 @@ class HallwayTilingTutorial(Slide):
         else:
             self.play(Write(self.subtitle), run_time=0.5)
     
+    # Transform(mob.copy(), target), where the copy is only there to show the target
+    def transform_copy(self, mob, target, **kwargs):
+        copy = mob.copy()
+        self.shown_copies.append((copy, target))
+        return Transform(copy, target, **kwargs)
+        
+    # Once transformed, a copy looks exactly like its target. It can go if the
+    # target itself is on screen, or if another copy already shows it.
+    def collapse_copies(self):
+        on_screen = set(id(x) for mob in self.mobjects for x in mob.get_family())
+        shown = set()
+        redundant = []
+        kept = []
+        for copy, target in self.shown_copies:
+            if id(copy) not in on_screen:
+                continue
+            key = tuple(id(x) for x in target.family_members_with_points())
+            if key in shown or all(i in on_screen for i in key):
+                redundant.append(copy)
+            else:
+                shown.add(key)
+                kept.append((copy, target))
+        self.shown_copies = kept
+        self.remove(*redundant)
+        
+    def report_slide(self):
+        family = [x for mob in self.mobjects for x in mob.get_family()]
+        points = sum(x.points.nbytes for x in family)
+        logger.info(
+            f"Slide {self.slide_index}: {len(self.mobjects)} mobjects on screen "
+            f"({len(family)} with submobjects), {points / 2**20:.2f} MiB of points"
+        )
+        
     def clear(self, *args):
+        if COLLAPSE_COPIES:
+            self.collapse_copies()
         exclusion = set([self.title, self.subtitle, self.title_underline] + list(args))
         def is_removable(x):
             return x not in exclusion
@@ -602,18 +821,84 @@ class HallwayTilingTutorial(Slide):
             self.remove(obj)
             
     def play(self, *args, **kwargs):
-        if DEV:
-            self.dev_play(*args, **kwargs)
-        else:
+        cached = False
+        if self.slide_cache is not None:
+            self.slide_cache.add_play(self.slide_key())
+            cached = self.slide_cache.has(self.slide_key())
+        if self.slide_index < self.skip_until_slide or cached or self.stills is not None or TEX_SCAN:
+            # the animation is not rendered, the mobjects just jump to where it ends
+            config.from_animation_number = self.renderer.num_plays + 1
+        if self.trace is None:
             super().play(*args, **kwargs)
+        else:
+            with self.trace.record(self, args):
+                super().play(*args, **kwargs)
+        if COLLAPSE_COPIES and len(self.shown_copies) > 0:
+            self.collapse_copies()
+        
+    def tear_down(self):
+        super().tear_down()
+        if self.slide_cache is not None:
+            self.slide_cache.finish()
+        if self.trace is not None:
+            self.trace.save()
+        if self.stills is not None:
+            self.stills.save()
+        
+    def pause(self):
+        super().pause()
+        if self.stills is not None:
+            self.stills.capture(self.slide_index, self.section)
+        if self.slide_cache is not None:
+            self.slide_cache.close(self.slide_key())
+        if REPORT_SLIDES:
+            self.report_slide()
+        self.slide_index += 1
+        if self.stop_after_slide is not None and self.slide_index > self.stop_after_slide:
+            raise EndSceneEarlyException()
+
+
+# Examples of tilings of a bigger board, streamed from brute.examples:
+#   EXAMPLES_N=40 EXAMPLES=10 manim tutorial.py TilingExamples
+class TilingExamples(Slide):
+    def construct(self):
+        n = EXAMPLES_N
+        floor = Floor(n)
+        scale = min(1, (config.frame_width - 1) / floor.width)
+        floor.scale(scale)
+        palette = {rot: prototype(LShapePiece, rot).scale(scale) for rot in (0, 90, 180, 270)}
         
-    def dev_play(self, *args, run_time=None, **kwargs):
-        RUN_TIME_SCALE = 0.2
-        if DEV:
-            if run_time is None:
-                run_time = RUN_TIME_SCALE
-            else:
-                run_time *= RUN_TIME_SCALE
+        n_text = MathTex(f"n = {n}").next_to(floor, UP * 0.5).scale(TEXT_SCALE)
         
-        super().play(*args, run_time=run_time, **kwargs)
-            
+        def make_coverage_text(c):
+            return Tex("coverage = ", f"${c}$").next_to(floor, DOWN * 0.5).scale(TEXT_SCALE)
+        
+        coverage_text = make_coverage_text(0)
+        self.play(FadeIn(floor), FadeIn(n_text), FadeIn(coverage_text))
+        self.pause()
+        
+        shown = []
+        for tiling, coverage in brute.examples(n, EXAMPLES, seed=EXAMPLES_SEED):
+            pieces = [palette[rot].copy().move_to(floor.get_coor(col)) for rot, col in tiling]
+            self.play(
+                *(FadeOut(piece) for piece in shown),
+                *(FadeIn(piece) for piece in pieces),
+                Transform(coverage_text, make_coverage_text(coverage))
+            )
+            shown = pieces
+            self.pause()
+
+
+# One scene per section, so they can be rendered in parallel. `python render.py`
+# renders all of them and glues them back into HallwayTilingTutorial.
+class IntroSection(HallwayTilingTutorial):
+    sections = ['intro']
+    
+class ProblemStatementSection(HallwayTilingTutorial):
+    sections = ['problem_statement']
+    
+class DpFormulaSection(HallwayTilingTutorial):
+    sections = ['dp_formula']
+    
+class DpOptimizationSection(HallwayTilingTutorial):
+    sections = ['dp_optimization']